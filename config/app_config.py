@@ -30,6 +30,22 @@ OLLAMA_CONFIG = {
     "TEMPERATURE": float(os.environ.get("OLLAMA_TEMPERATURE", 0.7)),
     "MAX_TOKENS": int(os.environ.get("OLLAMA_MAX_TOKENS", 2048)),
     "TIMEOUT": int(os.environ.get("OLLAMA_TIMEOUT", 60)),
+    "CONTEXT_WINDOW": int(os.environ.get("OLLAMA_NUM_CTX", 2048)),  # Ollama's default num_ctx
+    "CONNECT_TIMEOUT": float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", 3)),
+    "METADATA_TIMEOUT": float(os.environ.get("OLLAMA_METADATA_TIMEOUT", 10)),  # /api/version and /api/tags
+    "POOL_SIZE": int(os.environ.get("OLLAMA_POOL_SIZE", 10)),  # keep-alive connections
+    "RETRIES": int(os.environ.get("OLLAMA_RETRIES", 2)),
+    "RETRY_BACKOFF": float(os.environ.get("OLLAMA_RETRY_BACKOFF", 0.5)),  # seconds, doubled per retry
+    "BREAKER_THRESHOLD": int(os.environ.get("OLLAMA_BREAKER_THRESHOLD", 5)),  # consecutive failures
+    "BREAKER_RESET_SECONDS": float(os.environ.get("OLLAMA_BREAKER_RESET_SECONDS", 30)),
+    "RESPONSE_CACHE_ENABLED": os.environ.get("OLLAMA_RESPONSE_CACHE_ENABLED", "True").lower() == "true",
+    "RESPONSE_CACHE_PATH": str(DB_DIR / "llm_response_cache.sqlite3"),
+    "RESPONSE_CACHE_MAX_ENTRIES": int(os.environ.get("OLLAMA_RESPONSE_CACHE_MAX_ENTRIES", 5000)),
+    "RESPONSE_CACHE_TTL": int(os.environ.get("OLLAMA_RESPONSE_CACHE_TTL", 7 * 24 * 3600)),  # seconds
+    "MODEL_LIST_TTL": float(os.environ.get("OLLAMA_MODEL_LIST_TTL", 60)),  # seconds /api/tags is cached
+    "HEALTH_PROBE_ENABLED": os.environ.get("OLLAMA_HEALTH_PROBE", "True").lower() == "true",
+    "HEALTH_PROBE_INTERVAL": float(os.environ.get("OLLAMA_HEALTH_PROBE_INTERVAL", 30)),
+    "HEALTH_PROBE_MAX_INTERVAL": float(os.environ.get("OLLAMA_HEALTH_PROBE_MAX_INTERVAL", 300)),  # backoff cap
 }
 
 # ChromaDB Configuration
@@ -39,6 +55,27 @@ CHROMADB_CONFIG = {
     "EMBEDDING_MODEL": "sentence-transformers/all-MiniLM-L6-v2",
     "CHUNK_SIZE": 1000,
     "CHUNK_OVERLAP": 200,
+    "EMBEDDING_BATCH_SIZE": int(os.environ.get("EMBEDDING_BATCH_SIZE", 64)),
+    "WRITE_BATCH_SIZE": int(os.environ.get("CHROMADB_WRITE_BATCH_SIZE", 1000)),
+    "EMBEDDING_CACHE_ENABLED": os.environ.get("EMBEDDING_CACHE_ENABLED", "True").lower() == "true",
+    "EMBEDDING_CACHE_PATH": str(DB_DIR / "embedding_cache.sqlite3"),
+    "EMBEDDING_CACHE_MAX_ENTRIES": int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", 200000)),
+    "EMBEDDING_WORKERS": int(os.environ.get("EMBEDDING_WORKERS", 0)),  # 0 encodes in-process
+    "EMBEDDING_QUEUE_SIZE": int(os.environ.get("EMBEDDING_QUEUE_SIZE", 0)),  # 0 means 2 per worker
+    "EMBEDDING_POOL_MIN_TEXTS": 16,  # smaller requests (e.g. queries) stay in-process
+    "AUTO_MIGRATE": os.environ.get("CHROMADB_AUTO_MIGRATE", "True").lower() == "true",  # web app only
+    "MIGRATION_BATCH_SIZE": 256,
+    "MIGRATION_THROTTLE_SECONDS": 0.5,
+    "DROP_MIGRATED_COLLECTION": True,
+    # HNSW index settings for newly created collections; search_ef is also applied to existing ones
+    "HNSW_SPACE": os.environ.get("CHROMADB_HNSW_SPACE", "l2"),
+    "HNSW_M": int(os.environ.get("CHROMADB_HNSW_M", 16)),
+    "HNSW_CONSTRUCTION_EF": int(os.environ.get("CHROMADB_HNSW_CONSTRUCTION_EF", 100)),
+    "HNSW_SEARCH_EF": int(os.environ.get("CHROMADB_HNSW_SEARCH_EF", 100)),
+    "SNAPSHOT_PAGE_SIZE": int(os.environ.get("CHROMADB_SNAPSHOT_PAGE_SIZE", 1000)),
+    "SNAPSHOT_DIRECTORY": str(DATA_DIR / "snapshots"),  # where the snapshot API reads and writes
+    "QUERY_CACHE_SIZE": int(os.environ.get("QUERY_CACHE_SIZE", 1024)),
+    "RESULT_CACHE_SIZE": int(os.environ.get("RESULT_CACHE_SIZE", 512)),
 }
 
 # Network Configuration
@@ -58,9 +95,24 @@ NETWORK_CONFIG = {
 RAG_CONFIG = {
     "CHUNK_SIZE": 1000,
     "CHUNK_OVERLAP": 200,
+    "INGEST_BATCH_SIZE": 64,  # chunks handed to the vector store per write
+    "INGEST_MANIFEST_PATH": str(DB_DIR / "ingest_manifest.sqlite3"),
+    "PDF_WORKERS": int(os.environ.get("PDF_WORKERS", min(4, os.cpu_count() or 1))),
+    "PDF_PAGE_TIMEOUT": int(os.environ.get("PDF_PAGE_TIMEOUT", 30)),  # seconds
+    "PDF_PARALLEL_MIN_PAGES": 8,  # smaller PDFs are extracted in-process
     "SIMILARITY_THRESHOLD": 0.7,
     "MAX_RESULTS": 5,
     "EMBEDDING_DIMENSION": 384,
+    "SEARCH_MODE": os.environ.get("RAG_SEARCH_MODE", "vector"),  # vector, lexical, hybrid, auto
+    "RRF_K": 60,
+    "HYBRID_OVERFETCH": 3,
+    "CONTEXT_RESERVE_TOKENS": 600,  # room left for the answer
+    "CONTEXT_MMR_LAMBDA": 0.7,
+    "RERANK_ENABLED": os.environ.get("RAG_RERANK", "False").lower() == "true",
+    "RERANK_MODEL": os.environ.get("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+    "RERANK_CANDIDATES": 20,  # fetched from the vector store before reranking
+    "RERANK_TIME_BUDGET_MS": int(os.environ.get("RAG_RERANK_BUDGET_MS", 300)),
+    "RERANK_CACHE_SIZE": 4096,
 }
 
 # CrewAI Configuration
@@ -120,9 +172,16 @@ LOGGING_CONFIG = {
 UPLOAD_CONFIG = {
     "MAX_FILE_SIZE": 16 * 1024 * 1024,  # 16MB
     "ALLOWED_EXTENSIONS": {
-        "pdf", "txt", "docx", "xlsx", "xls", "csv"
+        "pdf", "txt", "md", "cfg", "conf", "docx", "xlsx", "xls", "csv"
     },
     "UPLOAD_FOLDER": str(DOCUMENTS_DIR),
+    "INGEST_WORKERS": int(os.environ.get("INGEST_WORKERS", 2)),  # uploads processed concurrently
+    "INGEST_JOB_HISTORY": 1000,  # finished jobs kept for status lookups
+    "WATCH_ENABLED": os.environ.get("DOCUMENTS_WATCH", "False").lower() == "true",
+    "WATCH_INTERVAL": float(os.environ.get("DOCUMENTS_WATCH_INTERVAL", 5)),  # seconds between polls
+    "WATCH_DEBOUNCE": float(os.environ.get("DOCUMENTS_WATCH_DEBOUNCE", 2)),  # seconds a file must be unchanged
+    "WATCH_WORKERS": int(os.environ.get("DOCUMENTS_WATCH_WORKERS", 2)),
+    "WATCH_STATE_PATH": str(DB_DIR / "watcher_state.json"),
 }
 
 # Database Configuration
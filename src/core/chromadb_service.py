@@ -3,35 +3,118 @@ ChromaDB Service
 Vector database service for document storage and retrieval
 """
 
+import atexit
+import functools
+import json
 import logging
+import math
 import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+
+try:
+    import fcntl
+except ImportError:  # Windows: the persist directory is not locked
+    fcntl = None
 
 # Import configuration
 from .config import config
+from .cache import LRUCache
+from .collection_migrator import CollectionMigrator
+from .embedding_cache import EmbeddingCache, content_hash
+from .embedding_pool import EmbeddingWorkerPool
+from .lexical_index import BM25Index, looks_like_identifier
+from .service_registry import registry
+
+
+def _exclusive_write(method):
+    """Serialize collection writes so a collection swap never races a writer
+
+    Writers that embed content use ChromaDBService._embedded_write instead,
+    so encoding does not hold the lock.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class DirectoryInUseError(RuntimeError):
+    """Raised when exclusive use of the persist directory is requested while another process has it open"""
 
 
 class ChromaDBService:
-    """ChromaDB service for vector database operations"""
+    """ChromaDB service for vector database operations
+    
+    Every instance holds a shared lock on the persist directory for the life
+    of the process. exclusive=True asks for it exclusively instead, failing
+    with DirectoryInUseError if the web app or another process has the
+    directory open; offline tools that rewrite the collection use this.
+    
+    auto_migrate starts re-embedding a collection built with another model
+    in the background. Only the web app passes it (per AUTO_MIGRATE): a
+    command line tool would exit partway through the copy.
+    """
+    
+    LOCK_FILE = '.service.lock'
     
-    def __init__(self):
+    def __init__(self, exclusive: bool = False, auto_migrate: bool = False):
         self.logger = logging.getLogger(__name__)
+        self.exclusive = exclusive
+        self._directory_lock = None
         self.client = None
         self.collection = None
+        self.collection_model = None
+        self.migrator = None
+        self._write_lock = threading.RLock()
         self.embedding_model = None
+        self.embedding_pool = None
+        self._extra_models = {}
+        self._model_lock = threading.Lock()
+        self.embedding_cache = None
+        self.last_batch_stats = {}
+        
+        # Query caches; search results are keyed by the collection generation,
+        # which every mutation bumps so stale results are never served
+        self.query_embedding_cache = LRUCache(config.chromadb['QUERY_CACHE_SIZE'])
+        self.search_result_cache = LRUCache(config.chromadb['RESULT_CACHE_SIZE'])
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        
+        # BM25 index mirroring the collection, built on first lexical query
+        self.lexical_index = BM25Index()
+        self._lexical_ready = False
+        self._lexical_lock = threading.Lock()
+        
         self._initialize_chromadb()
         self._initialize_embedding_model()
+        self._initialize_embedding_cache()
+        
+        if self.collection_model != config.chromadb['EMBEDDING_MODEL']:
+            self.logger.warning(
+                f"Collection {self.collection.name} was embedded with {self.collection_model}, "
+                f"configured model is {config.chromadb['EMBEDDING_MODEL']}"
+            )
+            if auto_migrate:
+                self.start_migration()
     
     def _initialize_chromadb(self):
         """Initialize ChromaDB client and collection"""
         try:
+            # Imported here so importing this module stays cheap
+            import chromadb
+            from chromadb.config import Settings
+            
             # Ensure persist directory exists
             persist_dir = config.chromadb['PERSIST_DIRECTORY']
             os.makedirs(persist_dir, exist_ok=True)
+            self._directory_lock = self._lock_persist_directory(persist_dir)
             
             # Initialize ChromaDB client
             self.client = chromadb.PersistentClient(
@@ -42,31 +125,216 @@ class ChromaDBService:
                 )
             )
             
-            # Get or create collection
+            self._open_active_collection()
+                
+        except Exception as e:
+            self.logger.error(f"Failed to initialize ChromaDB: {e}")
+            raise
+    
+    def _lock_persist_directory(self, persist_dir: str):
+        """Take the advisory lock on the persist directory, returning the open lock file"""
+        if fcntl is None:
+            return None
+        lock_file = open(os.path.join(persist_dir, self.LOCK_FILE), 'a')
+        try:
+            fcntl.flock(lock_file, (fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if self.exclusive:
+                lock_file.close()
+                raise DirectoryInUseError(f"{persist_dir} is open in another process")
+            # Only an exclusive holder (a snapshot import or export) blocks a shared lock
+            self.logger.warning(f"Waiting for exclusive use of {persist_dir} by another process to end")
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+        return lock_file
+    
+    @staticmethod
+    def hnsw_settings(**overrides) -> Dict[str, Any]:
+        """Get the HNSW index settings from config, with optional overrides"""
+        settings = {
+            'space': config.chromadb['HNSW_SPACE'],
+            'M': config.chromadb['HNSW_M'],
+            'construction_ef': config.chromadb['HNSW_CONSTRUCTION_EF'],
+            'search_ef': config.chromadb['HNSW_SEARCH_EF']
+        }
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return settings
+    
+    @classmethod
+    def collection_metadata(cls, model_name: str, hnsw: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Get the metadata a new collection is created with"""
+        hnsw = hnsw or cls.hnsw_settings()
+        return {
+            "description": "Network automation documents and configurations",
+            "embedding_model": model_name,
+            "hnsw:space": hnsw['space'],
+            "hnsw:M": hnsw['M'],
+            "hnsw:construction_ef": hnsw['construction_ef'],
+            "hnsw:search_ef": hnsw['search_ef']
+        }
+    
+    @staticmethod
+    def collection_name_for_model(model_name: str) -> str:
+        """Get the model-tagged collection name used for migrations"""
+        slug = re.sub(r'[^a-z0-9]+', '-', model_name.split('/')[-1].lower()).strip('-')
+        name = f"{config.chromadb['COLLECTION_NAME']}__{slug}"
+        # Chroma collection names are limited to 63 characters
+        if len(name) > 63:
+            name = f"{name[:54]}-{content_hash(model_name)[:8]}"
+        return name
+    
+    def _active_collection_file(self) -> str:
+        return os.path.join(config.chromadb['PERSIST_DIRECTORY'], 'active_collection.json')
+    
+    def _open_active_collection(self):
+        """Open the collection named by the active pointer, falling back to COLLECTION_NAME"""
+        collection = None
+        try:
+            with open(self._active_collection_file()) as f:
+                active_name = json.load(f)['collection']
+            collection = self.client.get_collection(name=active_name)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"Ignoring active collection pointer: {e}")
+        
+        if collection is None:
             collection_name = config.chromadb['COLLECTION_NAME']
             try:
-                self.collection = self.client.get_collection(name=collection_name)
-                self.logger.info(f"Connected to existing ChromaDB collection: {collection_name}")
+                collection = self.client.get_collection(name=collection_name)
             except Exception:
-                self.collection = self.client.create_collection(
+                collection = self.client.create_collection(
                     name=collection_name,
-                    metadata={"description": "Network automation documents and configurations"}
+                    metadata=self.collection_metadata(config.chromadb['EMBEDDING_MODEL'])
                 )
                 self.logger.info(f"Created new ChromaDB collection: {collection_name}")
-                
+        
+        model_name = (collection.metadata or {}).get('embedding_model')
+        if not model_name:
+            # Collections created before model tagging used the configured model
+            model_name = config.chromadb['EMBEDDING_MODEL']
+            try:
+                collection.modify(metadata=dict(collection.metadata or {}, embedding_model=model_name))
+            except Exception as e:
+                self.logger.warning(f"Could not tag collection {collection.name} with its model: {e}")
+        
+        self.collection = collection
+        self.collection_model = model_name
+        self._apply_hnsw_settings()
+        self.logger.info(f"Connected to ChromaDB collection: {collection.name} ({model_name})")
+    
+    def _apply_hnsw_settings(self):
+        """Apply the configured search_ef to the active collection
+        
+        space, M and construction_ef are fixed when an index is built; a
+        collection created with other values keeps them until it is rebuilt.
+        """
+        metadata = self.collection.metadata or {}
+        configured = self.hnsw_settings()
+        for key in ('space', 'M', 'construction_ef'):
+            current = metadata.get(f"hnsw:{key}")
+            if current is not None and current != configured[key]:
+                self.logger.warning(
+                    f"Collection {self.collection.name} was built with hnsw:{key}={current}, "
+                    f"configured {configured[key]} applies to new collections only"
+                )
+        
+        if metadata.get('hnsw:search_ef') == configured['search_ef']:
+            return
+        try:
+            self.collection.modify(configuration={'hnsw': {'ef_search': configured['search_ef']}})
+            self.logger.info(f"Set hnsw search_ef={configured['search_ef']} on {self.collection.name}")
         except Exception as e:
-            self.logger.error(f"Failed to initialize ChromaDB: {e}")
-            raise
+            self.logger.warning(f"Could not set hnsw search_ef on {self.collection.name}: {e}")
+    
+    def _activate_collection(self, collection, model_name: str):
+        """Make a collection the active one and persist the pointer"""
+        with self._write_lock:
+            self.collection = collection
+            self.collection_model = model_name
+            pointer = self._active_collection_file()
+            with open(f"{pointer}.tmp", 'w') as f:
+                json.dump({
+                    'collection': collection.name,
+                    'embedding_model': model_name,
+                    'activated_at': datetime.utcnow().isoformat()
+                }, f)
+            os.replace(f"{pointer}.tmp", pointer)
+            self._bump_generation()
+        self.logger.info(f"Active ChromaDB collection: {collection.name} ({model_name})")
+    
+    def start_migration(self, target_model: str = None) -> Dict[str, Any]:
+        """Start re-embedding the active collection with target_model in the background"""
+        target_model = target_model or config.chromadb['EMBEDDING_MODEL']
+        if self.migrator is not None and self.migrator.is_running():
+            return self.migrator.progress()
+        if target_model == self.collection_model:
+            return {'state': 'not_needed', 'target_model': target_model}
+        
+        self.migrator = CollectionMigrator(
+            self,
+            target_model,
+            batch_size=config.chromadb['MIGRATION_BATCH_SIZE'],
+            throttle_seconds=config.chromadb['MIGRATION_THROTTLE_SECONDS'],
+            drop_source=config.chromadb['DROP_MIGRATED_COLLECTION']
+        )
+        self.migrator.start()
+        return self.migrator.progress()
     
     def _initialize_embedding_model(self):
         """Initialize sentence transformer model for embeddings"""
+        workers = config.chromadb['EMBEDDING_WORKERS']
+        if workers > 0:
+            try:
+                self.embedding_pool = EmbeddingWorkerPool(
+                    config.chromadb['EMBEDDING_MODEL'],
+                    workers,
+                    config.chromadb['EMBEDDING_QUEUE_SIZE'] or None
+                )
+                atexit.register(self.embedding_pool.shutdown)
+                # The in-process model is loaded on demand for small requests
+                return
+            except Exception as e:
+                self.logger.warning(f"Embedding worker pool unavailable, encoding in-process: {e}")
+                self.embedding_pool = None
+        
+        self._load_embedding_model()
+    
+    def _load_embedding_model(self, model_name: str = None):
+        """Load an in-process sentence transformer model (the configured one by default)"""
+        primary = config.chromadb['EMBEDDING_MODEL']
+        model_name = model_name or primary
+        with self._model_lock:
+            model = self.embedding_model if model_name == primary else self._extra_models.get(model_name)
+            if model is not None:
+                return model
+            try:
+                from sentence_transformers import SentenceTransformer
+                
+                model = SentenceTransformer(model_name)
+                if model_name == primary:
+                    self.embedding_model = model
+                else:
+                    # Needed while a collection embedded with an older model is still active
+                    self._extra_models[model_name] = model
+                self.logger.info(f"Loaded embedding model: {model_name}")
+                return model
+            except Exception as e:
+                self.logger.error(f"Failed to load embedding model: {e}")
+                raise
+    
+    def _initialize_embedding_cache(self):
+        """Initialize the persistent embedding cache"""
+        if not config.chromadb['EMBEDDING_CACHE_ENABLED']:
+            return
         try:
-            model_name = config.chromadb['EMBEDDING_MODEL']
-            self.embedding_model = SentenceTransformer(model_name)
-            self.logger.info(f"Loaded embedding model: {model_name}")
+            self.embedding_cache = EmbeddingCache(
+                config.chromadb['EMBEDDING_CACHE_PATH'],
+                max_entries=config.chromadb['EMBEDDING_CACHE_MAX_ENTRIES']
+            )
         except Exception as e:
-            self.logger.error(f"Failed to load embedding model: {e}")
-            raise
+            # The cache only saves work, so run without it rather than fail
+            self.logger.warning(f"Embedding cache unavailable, continuing without it: {e}")
+            self.embedding_cache = None
     
     def add_document(self, document_id: str, content: str, metadata: Dict[str, Any] = None) -> bool:
         """Add a document to the vector database"""
@@ -74,19 +342,19 @@ class ChromaDBService:
             if metadata is None:
                 metadata = {}
             
-            # Add timestamp to metadata
+            # Add timestamp and content hash to metadata
             metadata['added_at'] = datetime.utcnow().isoformat()
+            metadata['content_hash'] = content_hash(content)
             
-            # Generate embedding
-            embedding = self.embedding_model.encode(content).tolist()
-            
-            # Add to collection
-            self.collection.add(
-                documents=[content],
-                embeddings=[embedding],
-                metadatas=[metadata],
-                ids=[document_id]
-            )
+            # Generate embedding, then add to collection
+            with self._embedded_write([content]) as embeddings:
+                self.collection.add(
+                    documents=[content],
+                    embeddings=embeddings,
+                    metadatas=[metadata],
+                    ids=[document_id]
+                )
+                self._index_lexical([document_id], [content], [metadata])
             
             self.logger.info(f"Added document to ChromaDB: {document_id}")
             return True
@@ -94,82 +362,443 @@ class ChromaDBService:
         except Exception as e:
             self.logger.error(f"Failed to add document {document_id}: {e}")
             return False
+        finally:
+            self._bump_generation()
+    
+    def _encode_texts(self, texts: List[str], batch_size: int = None, model_name: str = None) -> List[List[float]]:
+        """Encode texts in length-sorted mini-batches, preserving input order"""
+        if batch_size is None:
+            batch_size = config.chromadb['EMBEDDING_BATCH_SIZE']
+        
+        # On the worker pool, split the texts so every worker gets a share
+        # even when there are no more texts than one mini-batch
+        task_size = batch_size
+        pool = self._pool_for(model_name, len(texts))
+        if pool is not None:
+            task_size = max(1, min(batch_size, math.ceil(len(texts) / pool.workers)))
+        
+        # Sorting by length keeps similarly sized texts in the same mini-batch,
+        # so each forward pass pads to a short maximum instead of the longest text
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        batches = [order[start:start + task_size] for start in range(0, len(order), task_size)]
+        
+        vectors_per_batch = self._encode_batches(
+            [[texts[i] for i in indices] for indices in batches], batch_size, model_name
+        )
+        for indices, vectors in zip(batches, vectors_per_batch):
+            for index, vector in zip(indices, vectors):
+                embeddings[index] = vector
+        
+        return embeddings
     
-    def add_documents_batch(self, documents: List[Dict[str, Any]]) -> bool:
+    def _pool_for(self, model_name: Optional[str], count: int) -> Optional[EmbeddingWorkerPool]:
+        """Get the worker pool if it should encode count texts with model_name"""
+        model_name = model_name or config.chromadb['EMBEDDING_MODEL']
+        pool = self.embedding_pool
+        if pool is not None and pool.model_name == model_name and count >= config.chromadb['EMBEDDING_POOL_MIN_TEXTS']:
+            return pool
+        return None
+    
+    def _encode_batches(self, batches: List[List[str]], batch_size: int,
+                        model_name: str = None) -> List[List[List[float]]]:
+        """Encode mini-batches on the worker pool, or in-process for small requests"""
+        model_name = model_name or config.chromadb['EMBEDDING_MODEL']
+        pool = self._pool_for(model_name, sum(len(batch) for batch in batches))
+        if pool is not None:
+            try:
+                return pool.encode_batches(batches, batch_size)
+            except Exception as e:
+                self.logger.error(f"Embedding worker pool failed, falling back to in-process encoding: {e}")
+                self.embedding_pool = None
+                pool.shutdown()
+        
+        model = self._load_embedding_model(model_name)
+        return [
+            [vector.tolist() for vector in model.encode(batch, batch_size=batch_size, show_progress_bar=False)]
+            for batch in batches
+        ]
+    
+    def _embed(self, texts: List[str], batch_size: int = None, model_name: str = None) -> List[List[float]]:
+        """Embed texts with the active collection's model (or model_name), using the embedding cache"""
+        model_name = model_name or self.collection_model
+        if self.embedding_cache is None:
+            return self._encode_texts(texts, batch_size, model_name)
+        
+        hashes = [content_hash(text) for text in texts]
+        embeddings = self.embedding_cache.get_many(model_name, hashes)
+        
+        # Encode each distinct uncached text once
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in embeddings:
+                missing.setdefault(text_hash, text)
+        
+        if missing:
+            vectors = self._encode_texts(list(missing.values()), batch_size, model_name)
+            encoded = dict(zip(missing.keys(), vectors))
+            self.embedding_cache.put_many(model_name, encoded)
+            embeddings.update(encoded)
+        
+        return [embeddings[text_hash] for text_hash in hashes]
+    
+    @contextmanager
+    def _embedded_write(self, texts: List[str], batch_size: int = None):
+        """Embed texts without the write lock, then hold it while the caller writes them
+        
+        Encoding is the slow part of a write, so only the collection calls
+        are serialized. If a migration swaps the active collection while the
+        texts are being encoded, they are embedded again with the new model.
+        """
+        while True:
+            with self._write_lock:
+                collection, model_name = self.collection, self.collection_model
+            embeddings = self._embed(texts, batch_size, model_name) if texts else []
+            with self._write_lock:
+                if self.collection is collection:
+                    yield embeddings
+                    return
+            self.logger.info(f"Active collection changed while encoding; re-embedding {len(texts)} texts")
+    
+    def _write_batch_size(self) -> int:
+        """Get the largest slice that can be written to the collection at once"""
+        batch_size = config.chromadb['WRITE_BATCH_SIZE']
+        try:
+            batch_size = min(batch_size, self.client.get_max_batch_size())
+        except Exception:
+            pass
+        return max(1, batch_size)
+    
+    @staticmethod
+    def _peak_memory_mb() -> Optional[float]:
+        """Get peak resident memory of this process in MB"""
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+            divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+            return round(peak / divisor, 1)
+        except Exception:
+            return None
+    
+    def add_documents_batch(self, documents: List[Dict[str, Any]], batch_size: int = None) -> bool:
         """Add multiple documents in batch"""
         try:
             if not documents:
                 return True
             
+            started = time.perf_counter()
+            added_at = datetime.utcnow().isoformat()
+            
             ids = []
             contents = []
-            embeddings = []
             metadatas = []
             
             for doc in documents:
-                doc_id = doc['id']
-                content = doc['content']
-                metadata = doc.get('metadata', {})
-                
-                # Add timestamp to metadata
-                metadata['added_at'] = datetime.utcnow().isoformat()
+                metadata = dict(doc.get('metadata') or {})
                 
-                # Generate embedding
-                embedding = self.embedding_model.encode(content).tolist()
+                # Add timestamp and content hash to metadata
+                metadata['added_at'] = added_at
+                metadata['content_hash'] = content_hash(doc['content'])
                 
-                ids.append(doc_id)
-                contents.append(content)
-                embeddings.append(embedding)
+                ids.append(doc['id'])
+                contents.append(doc['content'])
                 metadatas.append(metadata)
             
-            # Add batch to collection
-            self.collection.add(
-                documents=contents,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
+            # Generate all embeddings in mini-batches, then write to collection in bounded slices
+            with self._embedded_write(contents, batch_size) as embeddings:
+                encoded = time.perf_counter()
+                write_size = self._write_batch_size()
+                for start in range(0, len(ids), write_size):
+                    end = start + write_size
+                    self.collection.add(
+                        documents=contents[start:end],
+                        embeddings=embeddings[start:end],
+                        metadatas=metadatas[start:end],
+                        ids=ids[start:end]
+                    )
+                self._index_lexical(ids, contents, metadatas)
+            
+            elapsed = time.perf_counter() - started
+            self.last_batch_stats = {
+                'documents': len(ids),
+                'encode_seconds': round(encoded - started, 3),
+                'write_seconds': round(elapsed - (encoded - started), 3),
+                'docs_per_second': round(len(ids) / elapsed, 1) if elapsed > 0 else None,
+                'peak_memory_mb': self._peak_memory_mb(),
+                'completed_at': datetime.utcnow().isoformat()
+            }
             
-            self.logger.info(f"Added {len(documents)} documents to ChromaDB")
+            self.logger.info(
+                f"Added {len(documents)} documents to ChromaDB "
+                f"({self.last_batch_stats['docs_per_second']} docs/sec, "
+                f"peak memory {self.last_batch_stats['peak_memory_mb']} MB)"
+            )
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to add documents batch: {e}")
             return False
+        finally:
+            self._bump_generation()
     
-    def search_documents(self, query: str, n_results: int = 5, filter_metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
-        try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode(query).tolist()
-            
-            # Search in collection
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=filter_metadata,
-                include=['documents', 'metadatas', 'distances']
+    def _bump_generation(self):
+        """Invalidate cached search results after a collection mutation"""
+        with self._generation_lock:
+            self._generation += 1
+        self.search_result_cache.clear()
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed search queries in one pass, reusing recent query embeddings"""
+        model_name = self.collection_model
+        embeddings = {}
+        missing = []
+        for query in dict.fromkeys(queries):
+            embedding = self.query_embedding_cache.get((model_name, query))
+            if embedding is None:
+                missing.append(query)
+            else:
+                embeddings[query] = embedding
+        
+        if missing:
+            for query, embedding in zip(missing, self._embed(missing, model_name=model_name)):
+                self.query_embedding_cache.set((model_name, query), embedding)
+                embeddings[query] = embedding
+        
+        return [embeddings[query] for query in queries]
+    
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a single search query"""
+        return self._embed_queries([query])[0]
+    
+    @staticmethod
+    def _filter_key(filter_metadata: Optional[Dict[str, Any]]) -> str:
+        """Get a stable cache key for a metadata filter"""
+        return json.dumps(filter_metadata, sort_keys=True, default=str)
+    
+    def _ensure_lexical_index(self):
+        """Build the BM25 index from the collection on first use"""
+        if self._lexical_ready:
+            return
+        with self._lexical_lock:
+            if self._lexical_ready:
+                return
+            started = time.perf_counter()
+            page_size = self._write_batch_size()
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    limit=page_size,
+                    offset=offset,
+                    include=['documents', 'metadatas']
+                )
+                for doc_id, content, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                    self.lexical_index.add(doc_id, content or '', metadata)
+                if len(page['ids']) < page_size:
+                    break
+                offset += page_size
+            self._lexical_ready = True
+            self.logger.info(
+                f"Built lexical index for {len(self.lexical_index)} documents "
+                f"in {time.perf_counter() - started:.2f}s"
             )
+    
+    def _index_lexical(self, ids: List[str], contents: List[str], metadatas: List[Dict[str, Any]]):
+        """Mirror written documents into the BM25 index once it is built"""
+        with self._lexical_lock:
+            if self._lexical_ready:
+                for doc_id, content, metadata in zip(ids, contents, metadatas):
+                    self.lexical_index.add(doc_id, content, metadata)
+    
+    def _unindex_lexical(self, ids: List[str]):
+        """Remove deleted documents from the BM25 index"""
+        with self._lexical_lock:
+            for doc_id in ids:
+                self.lexical_index.remove(doc_id)
+    
+    def _vector_search(self, query: str, n_results: int, filter_metadata: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Search the collection by embedding similarity"""
+        # Generate query embedding
+        query_embedding = self._embed_query(query)
+        
+        # Search in collection
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=filter_metadata,
+            include=['documents', 'metadatas', 'distances']
+        )
+        
+        return self._format_query_results(results, 0)
+    
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+        """Format the results of one query embedding from collection.query"""
+        formatted_results = []
+        if results['documents'] and results['documents'][index]:
+            for i, doc in enumerate(results['documents'][index]):
+                formatted_results.append({
+                    'id': results['ids'][index][i],
+                    'content': doc,
+                    'metadata': results['metadatas'][index][i],
+                    'distance': results['distances'][index][i],
+                    'similarity': 1 - results['distances'][index][i],
+                    'match': 'vector'
+                })
+        return formatted_results
+    
+    def _lexical_search(self, query: str, n_results: int, filter_metadata: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Search the BM25 index for literal token matches"""
+        self._ensure_lexical_index()
+        ranked = self.lexical_index.search(query, n_results, filter_metadata)
+        if not ranked:
+            return []
+        
+        stored = self.collection.get(ids=[doc_id for doc_id, _ in ranked], include=['documents', 'metadatas'])
+        documents = {
+            doc_id: (content, metadata)
+            for doc_id, content, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        }
+        
+        formatted_results = []
+        for doc_id, score in ranked:
+            if doc_id not in documents:
+                continue
+            content, metadata = documents[doc_id]
+            formatted_results.append({
+                'id': doc_id,
+                'content': content,
+                'metadata': metadata,
+                'distance': None,
+                'similarity': None,
+                'score': score,
+                'match': 'lexical'
+            })
+        return formatted_results
+    
+    def _hybrid_search(self, query: str, n_results: int, filter_metadata: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fuse vector and lexical rankings with reciprocal rank fusion"""
+        fetch = n_results * config.rag['HYBRID_OVERFETCH']
+        rrf_k = config.rag['RRF_K']
+        
+        rankings = [self._vector_search(query, fetch, filter_metadata)]
+        try:
+            rankings.append(self._lexical_search(query, fetch, filter_metadata))
+        except ValueError as e:
+            # Filters the BM25 index cannot evaluate fall back to vector ranking
+            self.logger.warning(f"Skipping lexical ranking: {e}")
+        
+        fused: Dict[str, Dict[str, Any]] = {}
+        for results in rankings:
+            for rank, result in enumerate(results):
+                entry = fused.get(result['id'])
+                if entry is None:
+                    entry = fused[result['id']] = dict(result, score=0.0)
+                elif entry['match'] != result['match']:
+                    entry['match'] = 'hybrid'
+                    if entry['distance'] is None:
+                        entry['distance'] = result['distance']
+                        entry['similarity'] = result['similarity']
+                entry['score'] += 1.0 / (rrf_k + rank + 1)
+        
+        ranked = sorted(fused.values(), key=lambda result: result['score'], reverse=True)
+        return ranked[:n_results]
+    
+    def search_documents(self, query: str, n_results: int = 5, filter_metadata: Dict[str, Any] = None,
+                         mode: str = None) -> List[Dict[str, Any]]:
+        """Search for similar documents
+        
+        mode is one of 'vector', 'lexical', 'hybrid' or 'auto'; 'auto' takes the
+        lexical fast path for identifier-like queries and uses hybrid otherwise.
+        """
+        try:
+            mode = mode or config.rag['SEARCH_MODE']
+            if mode not in ('vector', 'lexical', 'hybrid', 'auto'):
+                raise ValueError(f"Unknown search mode: {mode}")
             
-            # Format results
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        'id': results['ids'][0][i],
-                        'content': doc,
-                        'metadata': results['metadatas'][0][i],
-                        'distance': results['distances'][0][i],
-                        'similarity': 1 - results['distances'][0][i]
-                    })
-            
-            self.logger.info(f"Found {len(formatted_results)} similar documents for query")
-            return formatted_results
+            cache_key = (self._generation, query, n_results, self._filter_key(filter_metadata), mode)
+            cached = self.search_result_cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug("Serving search results from cache")
+                return [dict(result) for result in cached]
+            
+            if mode == 'auto':
+                formatted_results = []
+                if looks_like_identifier(query):
+                    formatted_results = self._lexical_search(query, n_results, filter_metadata)
+                if not formatted_results:
+                    formatted_results = self._hybrid_search(query, n_results, filter_metadata)
+            elif mode == 'lexical':
+                formatted_results = self._lexical_search(query, n_results, filter_metadata)
+            elif mode == 'hybrid':
+                formatted_results = self._hybrid_search(query, n_results, filter_metadata)
+            else:
+                formatted_results = self._vector_search(query, n_results, filter_metadata)
+            
+            self.search_result_cache.set(cache_key, formatted_results)
+            
+            self.logger.info(f"Found {len(formatted_results)} similar documents for query ({mode})")
+            return [dict(result) for result in formatted_results]
             
         except Exception as e:
             self.logger.error(f"Failed to search documents: {e}")
             return []
     
+    def search_documents_batch(self, queries: List[str], n_results: int = 5,
+                               filters: Any = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one embedding pass
+        
+        filters is either one metadata filter shared by all queries or a list
+        with one filter per query; queries sharing a filter are sent to the
+        collection in a single multi-embedding query.
+        """
+        try:
+            if not queries:
+                return []
+            if filters is None or isinstance(filters, dict):
+                filters = [filters] * len(queries)
+            elif len(filters) != len(queries):
+                raise ValueError("filters must be a single filter or one per query")
+            
+            results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+            cache_keys = [
+                (self._generation, query, n_results, self._filter_key(filter_metadata), 'vector')
+                for query, filter_metadata in zip(queries, filters)
+            ]
+            
+            # Group uncached queries by filter
+            groups: Dict[str, List[int]] = {}
+            for i, cache_key in enumerate(cache_keys):
+                cached = self.search_result_cache.get(cache_key)
+                if cached is not None:
+                    results[i] = cached
+                else:
+                    groups.setdefault(cache_key[3], []).append(i)
+            
+            pending = [i for indices in groups.values() for i in indices]
+            if pending:
+                embeddings = dict(zip(pending, self._embed_queries([queries[i] for i in pending])))
+                for indices in groups.values():
+                    response = self.collection.query(
+                        query_embeddings=[embeddings[i] for i in indices],
+                        n_results=n_results,
+                        where=filters[indices[0]],
+                        include=['documents', 'metadatas', 'distances']
+                    )
+                    for position, i in enumerate(indices):
+                        results[i] = self._format_query_results(response, position)
+                        self.search_result_cache.set(cache_keys[i], results[i])
+            
+            self.logger.info(
+                f"Batch searched {len(queries)} queries "
+                f"({len(queries) - len(pending)} cached, {len(groups)} collection queries)"
+            )
+            return [[dict(result) for result in query_results] for query_results in results]
+            
+        except Exception as e:
+            self.logger.error(f"Failed to batch search documents: {e}")
+            return [[] for _ in queries]
+    
     def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific document by ID"""
         try:
@@ -190,29 +819,154 @@ class ChromaDBService:
             self.logger.error(f"Failed to get document {document_id}: {e}")
             return None
     
+    @_exclusive_write
     def delete_document(self, document_id: str) -> bool:
         """Delete a document from the vector database"""
         try:
             self.collection.delete(ids=[document_id])
+            self._unindex_lexical([document_id])
             self.logger.info(f"Deleted document from ChromaDB: {document_id}")
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to delete document {document_id}: {e}")
             return False
+        finally:
+            self._bump_generation()
+    
+    @_exclusive_write
+    def delete_documents(self, document_ids: List[str]) -> bool:
+        """Delete multiple documents from the vector database"""
+        try:
+            if not document_ids:
+                return True
+            write_size = self._write_batch_size()
+            for start in range(0, len(document_ids), write_size):
+                self.collection.delete(ids=document_ids[start:start + write_size])
+            self._unindex_lexical(document_ids)
+            self.logger.info(f"Deleted {len(document_ids)} documents from ChromaDB")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to delete documents: {e}")
+            return False
+        finally:
+            self._bump_generation()
     
     def update_document(self, document_id: str, content: str, metadata: Dict[str, Any] = None) -> bool:
         """Update an existing document"""
         try:
-            # Delete existing document
-            self.delete_document(document_id)
-            
-            # Add updated document
-            return self.add_document(document_id, content, metadata)
+            return self.upsert_document(document_id, content, metadata)
             
         except Exception as e:
             self.logger.error(f"Failed to update document {document_id}: {e}")
             return False
+        finally:
+            self._bump_generation()
+    
+    def upsert_document(self, document_id: str, content: str, metadata: Dict[str, Any] = None) -> bool:
+        """Insert or replace a document, skipping re-embedding if its content is unchanged"""
+        return self.upsert_documents_batch([{
+            'id': document_id,
+            'content': content,
+            'metadata': metadata
+        }])
+    
+    @staticmethod
+    def _comparable_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Get metadata without the bookkeeping timestamps"""
+        return {k: v for k, v in (metadata or {}).items() if k not in ('added_at', 'updated_at')}
+    
+    def upsert_documents_batch(self, documents: List[Dict[str, Any]], batch_size: int = None) -> bool:
+        """Insert or replace multiple documents, re-embedding only changed content"""
+        try:
+            if not documents:
+                return True
+            
+            started = time.perf_counter()
+            now = datetime.utcnow().isoformat()
+            
+            # Later entries win if an id appears more than once
+            pending = {}
+            for doc in documents:
+                metadata = dict(doc.get('metadata') or {})
+                metadata['content_hash'] = content_hash(doc['content'])
+                pending[doc['id']] = (doc['content'], metadata)
+            
+            ids = list(pending)
+            write_size = self._write_batch_size()
+            
+            # Look up stored metadata to find documents whose content is unchanged
+            existing = {}
+            for start in range(0, len(ids), write_size):
+                stored = self.collection.get(ids=ids[start:start + write_size], include=['metadatas'])
+                for doc_id, stored_metadata in zip(stored['ids'], stored['metadatas']):
+                    existing[doc_id] = stored_metadata or {}
+            
+            changed_ids = []
+            metadata_only_ids = []
+            for doc_id in ids:
+                content, metadata = pending[doc_id]
+                previous = existing.get(doc_id)
+                
+                if previous is None:
+                    metadata['added_at'] = now
+                    changed_ids.append(doc_id)
+                    continue
+                
+                metadata['added_at'] = previous.get('added_at', now)
+                if previous.get('content_hash') != metadata['content_hash']:
+                    metadata['updated_at'] = now
+                    changed_ids.append(doc_id)
+                elif self._comparable_metadata(previous) != self._comparable_metadata(metadata):
+                    metadata['updated_at'] = now
+                    metadata_only_ids.append(doc_id)
+            
+            # New or changed content needs fresh embeddings
+            with self._embedded_write([pending[doc_id][0] for doc_id in changed_ids], batch_size) as embeddings:
+                for start in range(0, len(changed_ids), write_size):
+                    end = start + write_size
+                    slice_ids = changed_ids[start:end]
+                    self.collection.upsert(
+                        ids=slice_ids,
+                        documents=[pending[doc_id][0] for doc_id in slice_ids],
+                        embeddings=embeddings[start:end],
+                        metadatas=[pending[doc_id][1] for doc_id in slice_ids]
+                    )
+                
+                # Unchanged content with new metadata reuses the stored embedding
+                for start in range(0, len(metadata_only_ids), write_size):
+                    slice_ids = metadata_only_ids[start:start + write_size]
+                    stored = self.collection.get(ids=slice_ids, include=['embeddings'])
+                    stored_embeddings = dict(zip(stored['ids'], stored['embeddings']))
+                    self.collection.upsert(
+                        ids=slice_ids,
+                        documents=[pending[doc_id][0] for doc_id in slice_ids],
+                        embeddings=[stored_embeddings[doc_id] for doc_id in slice_ids],
+                        metadatas=[pending[doc_id][1] for doc_id in slice_ids]
+                    )
+                
+                touched_ids = changed_ids + metadata_only_ids
+                self._index_lexical(
+                    touched_ids,
+                    [pending[doc_id][0] for doc_id in touched_ids],
+                    [pending[doc_id][1] for doc_id in touched_ids]
+                )
+            
+            elapsed = time.perf_counter() - started
+            unchanged = len(ids) - len(changed_ids) - len(metadata_only_ids)
+            self.logger.info(
+                f"Upserted {len(ids)} documents to ChromaDB in {elapsed:.2f}s "
+                f"({len(changed_ids)} embedded, {len(metadata_only_ids)} metadata only, "
+                f"{unchanged} unchanged)"
+            )
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to upsert documents batch: {e}")
+            return False
+        finally:
+            self._bump_generation()
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get collection statistics"""
@@ -220,9 +974,20 @@ class ChromaDBService:
             count = self.collection.count()
             return {
                 'document_count': count,
-                'collection_name': config.chromadb['COLLECTION_NAME'],
-                'embedding_model': config.chromadb['EMBEDDING_MODEL'],
-                'persist_directory': config.chromadb['PERSIST_DIRECTORY']
+                'collection_name': self.collection.name,
+                'embedding_model': self.collection_model,
+                'configured_embedding_model': config.chromadb['EMBEDDING_MODEL'],
+                'persist_directory': config.chromadb['PERSIST_DIRECTORY'],
+                'last_batch': self.last_batch_stats,
+                'embedding_cache': self.embedding_cache.stats() if self.embedding_cache else {'enabled': False},
+                'embedding_pool': self.embedding_pool.stats() if self.embedding_pool else {'enabled': False},
+                'query_embedding_cache': self.query_embedding_cache.stats(),
+                'search_result_cache': self.search_result_cache.stats(),
+                'generation': self._generation,
+                'lexical_index': {
+                    'built': self._lexical_ready,
+                    'document_count': len(self.lexical_index)
+                }
             }
         except Exception as e:
             self.logger.error(f"Failed to get collection stats: {e}")
@@ -233,14 +998,15 @@ class ChromaDBService:
         try:
             stats = {
                 'document_count': self.collection.count(),
-                'collection_name': config.chromadb['COLLECTION_NAME'],
-                'embedding_model': config.chromadb['EMBEDDING_MODEL']
+                'collection_name': self.collection.name,
+                'embedding_model': self.collection_model
             }
             
             return {
                 'status': 'healthy',
                 'timestamp': datetime.utcnow().isoformat(),
-                'collection_stats': stats
+                'collection_stats': stats,
+                'migration': self.migrator.progress() if self.migrator else None
             }
             
         except Exception as e:
@@ -250,19 +1016,32 @@ class ChromaDBService:
                 'timestamp': datetime.utcnow().isoformat()
             }
     
+    @_exclusive_write
     def reset_collection(self) -> bool:
         """Reset (clear) the entire collection - USE WITH CAUTION"""
         try:
+            if self.migrator is not None and self.migrator.is_running():
+                self.migrator.cancel()
+            
             collection_name = config.chromadb['COLLECTION_NAME']
+            model_name = config.chromadb['EMBEDDING_MODEL']
             
-            # Delete existing collection
-            self.client.delete_collection(name=collection_name)
+            # Delete the active collection and any migration shadow
+            for name in {self.collection.name, collection_name, self.collection_name_for_model(model_name)}:
+                try:
+                    self.client.delete_collection(name=name)
+                except Exception:
+                    pass
             
             # Create new collection
-            self.collection = self.client.create_collection(
+            collection = self.client.create_collection(
                 name=collection_name,
-                metadata={"description": "Network automation documents and configurations"}
+                metadata=self.collection_metadata(model_name)
             )
+            self._activate_collection(collection, model_name)
+            
+            with self._lexical_lock:
+                self.lexical_index.clear()
             
             self.logger.warning(f"Reset ChromaDB collection: {collection_name}")
             return True
@@ -270,13 +1049,27 @@ class ChromaDBService:
         except Exception as e:
             self.logger.error(f"Failed to reset collection: {e}")
             return False
+        finally:
+            self._bump_generation()
 
 
-# Global ChromaDB service instance
-chromadb_service = ChromaDBService()
+# Global ChromaDB service, built on first use or by registry warmup
+registry.register('chromadb', ChromaDBService)
+chromadb_service = registry.proxy('chromadb')
 
 
 # Dependency function
 def get_chromadb_service() -> ChromaDBService:
     """Get ChromaDB service instance"""
-    return chromadb_service 
\ No newline at end of file
+    return registry.get('chromadb') 
+
+def open_exclusive() -> ChromaDBService:
+    """Build the shared service with exclusive use of the persist directory
+    
+    For command line tools that write to the collection: they must not run
+    beside the web app, whose lexical index and result cache would not see
+    their writes. Raises DirectoryInUseError while another process has the
+    directory open.
+    """
+    registry.register('chromadb', lambda: ChromaDBService(exclusive=True))
+    return registry.get('chromadb')
@@ -0,0 +1,187 @@
+"""
+Collection Migrator
+Background re-embedding of the active collection into a shadow collection for a new model
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .embedding_cache import content_hash
+
+
+class CollectionMigrator:
+    """Re-embeds the active collection with a new model in throttled batches, then swaps
+
+    Queries keep hitting the source collection for the whole copy. Writes made
+    meanwhile are caught up by a reconciliation pass, and the final pass plus
+    the swap run under the service write lock so no write is lost.
+    """
+
+    def __init__(self, service, target_model: str, batch_size: int = 256,
+                 throttle_seconds: float = 0.5, drop_source: bool = True):
+        self.logger = logging.getLogger(__name__)
+        self.service = service
+        self.target_model = target_model
+        self.batch_size = batch_size
+        self.throttle_seconds = throttle_seconds
+        self.drop_source = drop_source
+
+        self.state = 'pending'  # pending, running, reconciling, completed, failed, cancelled
+        self.source_name: Optional[str] = None
+        self.shadow_name: Optional[str] = None
+        self.total = 0
+        self.processed = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> threading.Thread:
+        """Run the migration in a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name="collection-migrator", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def cancel(self):
+        """Stop the migration before the swap; the source collection stays active"""
+        self._stop.set()
+
+    def is_running(self) -> bool:
+        return self.state in ('pending', 'running', 'reconciling')
+
+    def progress(self) -> Dict[str, Any]:
+        """Get migration progress"""
+        return {
+            'state': self.state,
+            'source_collection': self.source_name,
+            'shadow_collection': self.shadow_name,
+            'target_model': self.target_model,
+            'processed': self.processed,
+            'total': self.total,
+            'percent': round(100.0 * self.processed / self.total, 1) if self.total else None,
+            'error': self.error,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def _run(self):
+        try:
+            self.state = 'running'
+            self.started_at = datetime.utcnow().isoformat()
+
+            source = self.service.collection
+            self.source_name = source.name
+            self.shadow_name = self.service.collection_name_for_model(self.target_model)
+            # An interrupted earlier run leaves its shadow behind; resume into it
+            shadow = self.service.client.get_or_create_collection(
+                name=self.shadow_name,
+                metadata=self.service.collection_metadata(self.target_model)
+            )
+            self.total = source.count()
+            self.logger.info(
+                f"Migrating {self.total} documents from {self.source_name} "
+                f"to {self.shadow_name} ({self.target_model})"
+            )
+
+            # Bulk copy in throttled pages while queries keep using the source
+            offset = 0
+            while not self._stop.is_set():
+                page = source.get(limit=self.batch_size, offset=offset, include=['documents', 'metadatas'])
+                if not page['ids']:
+                    break
+                self._copy(shadow, page['ids'], page['documents'], page['metadatas'])
+                offset += len(page['ids'])
+                self.processed = min(offset, self.total)
+                if len(page['ids']) < self.batch_size:
+                    break
+                self._stop.wait(self.throttle_seconds)
+
+            if self._stop.is_set():
+                self.state = 'cancelled'
+                self.logger.warning(f"Migration to {self.shadow_name} cancelled")
+                return
+
+            # Catch up on writes made during the copy, then repeat under the
+            # write lock so the swap cannot race a concurrent writer
+            self.state = 'reconciling'
+            self._reconcile(source, shadow)
+            with self.service._write_lock:
+                if self._stop.is_set():
+                    self.state = 'cancelled'
+                    return
+                self._reconcile(source, shadow)
+                self.service._activate_collection(shadow, self.target_model)
+            self.processed = self.total = shadow.count()
+
+            if self.drop_source:
+                self.service.client.delete_collection(name=self.source_name)
+
+            self.state = 'completed'
+            self.logger.info(f"Migration complete, active collection is now {self.shadow_name}")
+
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            self.logger.error(f"Collection migration failed: {e}")
+        finally:
+            self.finished_at = datetime.utcnow().isoformat()
+
+    @staticmethod
+    def _target_metadata(document: str, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Metadata as written to the shadow collection"""
+        return dict(metadata or {}, content_hash=content_hash(document or ''))
+
+    def _copy(self, shadow, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Re-embed and write documents the shadow does not already hold unchanged"""
+        targets = [self._target_metadata(doc, meta) for doc, meta in zip(documents, metadatas)]
+
+        existing = shadow.get(ids=ids, include=['metadatas'])
+        current = dict(zip(existing['ids'], existing['metadatas']))
+        todo = [i for i, doc_id in enumerate(ids) if current.get(doc_id) != targets[i]]
+        if not todo:
+            return
+
+        texts = [documents[i] or '' for i in todo]
+        embeddings = self.service._embed(texts, model_name=self.target_model)
+        shadow.upsert(
+            ids=[ids[i] for i in todo],
+            documents=texts,
+            embeddings=embeddings,
+            metadatas=[targets[i] for i in todo]
+        )
+
+    def _snapshot(self, collection, include_documents: bool) -> Dict[str, Dict[str, Any]]:
+        """Map every id in a collection to its (target-form) metadata"""
+        snapshot = {}
+        include = ['documents', 'metadatas'] if include_documents else ['metadatas']
+        offset = 0
+        while True:
+            page = collection.get(limit=self.batch_size, offset=offset, include=include)
+            for i, doc_id in enumerate(page['ids']):
+                if include_documents:
+                    snapshot[doc_id] = self._target_metadata(page['documents'][i], page['metadatas'][i])
+                else:
+                    snapshot[doc_id] = page['metadatas'][i]
+            if len(page['ids']) < self.batch_size:
+                return snapshot
+            offset += self.batch_size
+
+    def _reconcile(self, source, shadow):
+        """Bring the shadow collection in line with the source"""
+        source_state = self._snapshot(source, include_documents=True)
+        shadow_state = self._snapshot(shadow, include_documents=False)
+
+        changed = [doc_id for doc_id, metadata in source_state.items() if shadow_state.get(doc_id) != metadata]
+        stale = [doc_id for doc_id in shadow_state if doc_id not in source_state]
+
+        for start in range(0, len(changed), self.batch_size):
+            page = source.get(ids=changed[start:start + self.batch_size], include=['documents', 'metadatas'])
+            self._copy(shadow, page['ids'], page['documents'], page['metadatas'])
+        for start in range(0, len(stale), self.batch_size):
+            shadow.delete(ids=stale[start:start + self.batch_size])
+
+        if changed or stale:
+            self.logger.info(f"Reconciled migration: {len(changed)} copied, {len(stale)} removed")
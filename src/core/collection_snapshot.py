@@ -0,0 +1,259 @@
+"""
+Collection Snapshot
+Streaming export/import of a collection, embeddings included, as paged npz shards
+
+While the web app is running, export and import go through it
+(POST /api/chromadb/snapshot/export and /import, or this CLI with --url),
+because only the process that owns the collection can block its writers.
+Run offline, the CLI takes the persist directory exclusively and refuses to
+start while any other process has it open.
+
+Usage (from src/):
+    python -m core.collection_snapshot export ../data/snapshots/nightly
+    python -m core.collection_snapshot --url http://localhost:5000 export nightly
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .config import config
+from .embedding_cache import content_hash
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+logger = logging.getLogger(__name__)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_shard(path: str, ids: List[str], documents: List[str],
+                 metadatas: List[Dict[str, Any]], embeddings, compress: bool):
+    """Write one page of the collection as an npz shard"""
+    import numpy as np
+
+    # Text and metadata go in as UTF-8 JSON so shards load without pickle
+    arrays = {
+        'ids': np.frombuffer(json.dumps(ids).encode('utf-8'), dtype=np.uint8),
+        'documents': np.frombuffer(json.dumps(documents).encode('utf-8'), dtype=np.uint8),
+        'metadatas': np.frombuffer(json.dumps(metadatas).encode('utf-8'), dtype=np.uint8),
+        'embeddings': np.asarray(embeddings, dtype=np.float32),
+    }
+    with open(path, 'wb') as f:
+        if compress:
+            np.savez_compressed(f, **arrays)
+        else:
+            np.savez(f, **arrays)
+
+
+def _read_shard(path: str) -> Dict[str, Any]:
+    """Read one npz shard back into lists"""
+    import numpy as np
+
+    with np.load(path, allow_pickle=False) as shard:
+        return {
+            'ids': json.loads(shard['ids'].tobytes().decode('utf-8')),
+            'documents': json.loads(shard['documents'].tobytes().decode('utf-8')),
+            'metadatas': json.loads(shard['metadatas'].tobytes().decode('utf-8')),
+            'embeddings': shard['embeddings'],
+        }
+
+
+def export_snapshot(service, directory: str, page_size: int = None, compress: bool = True) -> Dict[str, Any]:
+    """Export the active collection to directory, one shard per page
+
+    Only one page is held in memory at a time. Writes are blocked for the
+    duration so the snapshot is consistent.
+    """
+    page_size = page_size or config.chromadb['SNAPSHOT_PAGE_SIZE']
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+
+    shards = []
+    total = 0
+    dimension = None
+    with service._write_lock:
+        collection = service.collection
+        model_name = service.collection_model
+        offset = 0
+        while True:
+            page = collection.get(
+                limit=page_size, offset=offset,
+                include=['documents', 'metadatas', 'embeddings']
+            )
+            if not len(page['ids']):
+                break
+
+            if dimension is None:
+                dimension = len(page['embeddings'][0])
+            shard_name = f"shard-{len(shards):05d}.npz"
+            shard_path = os.path.join(directory, shard_name)
+            _write_shard(
+                shard_path, list(page['ids']), list(page['documents']),
+                list(page['metadatas']), page['embeddings'], compress
+            )
+            shards.append({
+                'file': shard_name,
+                'count': len(page['ids']),
+                'sha256': _file_sha256(shard_path)
+            })
+            total += len(page['ids'])
+            offset += len(page['ids'])
+            if len(page['ids']) < page_size:
+                break
+
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'collection_name': collection.name,
+        'embedding_model': model_name,
+        'dimension': dimension,
+        'document_count': total,
+        'shards': shards,
+        'created_at': datetime.utcnow().isoformat()
+    }
+    # The manifest is written last, so a directory without one is an incomplete export
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    with open(f"{manifest_path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Exported {total} documents in {len(shards)} shards to {directory} in {elapsed:.2f}s")
+    return dict(manifest, seconds=round(elapsed, 3))
+
+
+def import_snapshot(service, directory: str, verify: bool = True) -> Dict[str, Any]:
+    """Load a snapshot into the active collection without re-encoding
+
+    A snapshot embedded with a different model than the active collection is
+    only accepted while the active collection is empty, in which case the
+    snapshot's model-tagged collection becomes the active one.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+
+    started = time.perf_counter()
+    model_name = manifest['embedding_model']
+    imported = 0
+
+    with service._write_lock:
+        try:
+            target = service.collection
+            adopt = model_name != service.collection_model
+            if adopt:
+                if service.collection.count():
+                    raise ValueError(
+                        f"Snapshot was embedded with {model_name} but the active collection "
+                        f"uses {service.collection_model} and is not empty"
+                    )
+                target = service.client.get_or_create_collection(
+                    name=service.collection_name_for_model(model_name),
+                    metadata=service.collection_metadata(model_name)
+                )
+
+            write_size = service._write_batch_size()
+            for shard_info in manifest['shards']:
+                shard_path = os.path.join(directory, shard_info['file'])
+                if verify and _file_sha256(shard_path) != shard_info['sha256']:
+                    raise ValueError(f"Checksum mismatch in snapshot shard {shard_info['file']}")
+
+                shard = _read_shard(shard_path)
+                for start in range(0, len(shard['ids']), write_size):
+                    end = start + write_size
+                    target.upsert(
+                        ids=shard['ids'][start:end],
+                        documents=shard['documents'][start:end],
+                        embeddings=shard['embeddings'][start:end].tolist(),
+                        metadatas=shard['metadatas'][start:end]
+                    )
+
+                # Seed the embedding cache so re-ingesting the same text skips encoding
+                if service.embedding_cache is not None:
+                    service.embedding_cache.put_many(model_name, {
+                        content_hash(content or ''): vector.tolist()
+                        for content, vector in zip(shard['documents'], shard['embeddings'])
+                    })
+                imported += len(shard['ids'])
+
+            if adopt:
+                service._activate_collection(target, model_name)
+        finally:
+            # The lexical index is rebuilt from the collection on next use
+            with service._lexical_lock:
+                service.lexical_index.clear()
+                service._lexical_ready = False
+            service._bump_generation()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Imported {imported} documents from {directory} in {elapsed:.2f}s")
+    return {
+        'document_count': imported,
+        'collection_name': target.name,
+        'embedding_model': model_name,
+        'seconds': round(elapsed, 3)
+    }
+
+
+def _run_remote(args) -> Dict[str, Any]:
+    """Run the export or import through the snapshot API of a running app"""
+    import requests
+
+    payload = {'name': args.directory}
+    if args.action == 'export':
+        payload.update(page_size=args.page_size, compress=not args.no_compress)
+    else:
+        payload['verify'] = not args.no_verify
+    response = requests.post(f"{args.url.rstrip('/')}/api/chromadb/snapshot/{args.action}", json=payload)
+    result = response.json()
+    if not response.ok:
+        raise RuntimeError(result.get('error', f"HTTP {response.status_code}"))
+    return result
+
+
+def main():
+    """Command line entry point: python -m core.collection_snapshot [--url URL] export|import <dir>"""
+    parser = argparse.ArgumentParser(description="Export or import a ChromaDB collection snapshot")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('directory', help="snapshot directory, or snapshot name under SNAPSHOT_DIRECTORY with --url")
+    parser.add_argument('--url', default=None, help="run through the web app at this URL instead of opening the database")
+    parser.add_argument('--page-size', type=int, default=None)
+    parser.add_argument('--no-compress', action='store_true', help="write uncompressed shards (export)")
+    parser.add_argument('--no-verify', action='store_true', help="skip shard checksums (import)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.url:
+        print(json.dumps(_run_remote(args), indent=2))
+        return
+
+    from .chromadb_service import ChromaDBService, DirectoryInUseError
+
+    try:
+        # Exclusive, so the collection cannot change under another process's write lock
+        service = ChromaDBService(exclusive=True)
+    except DirectoryInUseError as e:
+        sys.exit(f"{e}. Stop the web app, or run with --url to go through it.")
+    if args.action == 'export':
+        result = export_snapshot(service, args.directory, args.page_size, compress=not args.no_compress)
+    else:
+        result = import_snapshot(service, args.directory, verify=not args.no_verify)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ import os
 
 from .models import Base, Device, Document, AuditResult, ChatMessage
 from .config import config
+from .service_registry import registry
 
 
 class DatabaseManager:
@@ -146,6 +147,8 @@ class DatabaseManager:
             session.add(document)
             session.flush()
             session.refresh(document)
+            # Detach so attributes stay readable after the session closes
+            session.expunge(document)
             return document
     
     def get_document(self, document_id: int) -> Optional[Document]:
@@ -172,6 +175,7 @@ class DatabaseManager:
                         setattr(document, key, value)
                 session.flush()
                 session.refresh(document)
+                session.expunge(document)
                 return document
             return None
     
@@ -318,11 +322,12 @@ class DatabaseManager:
             raise
 
 
-# Global database manager instance
-db_manager = DatabaseManager()
+# Global database manager, built on first use or by registry warmup
+registry.register('database', DatabaseManager)
+db_manager = registry.proxy('database')
 
 
 # Dependency for FastAPI/Flask
 def get_database() -> DatabaseManager:
     """Get database manager instance"""
-    return db_manager 
\ No newline at end of file
+    return registry.get('database') 
\ No newline at end of file
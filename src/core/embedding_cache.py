@@ -0,0 +1,147 @@
+"""
+Embedding Cache
+Persistent content-addressed cache for text embeddings
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Any, Iterable
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_PARAM_CHUNK = 500
+
+
+def content_hash(text: str) -> str:
+    """Get the sha256 hex digest of a text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache keyed by (model name, content hash) with LRU eviction"""
+
+    def __init__(self, path: str, max_entries: int = 200000):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._initialize_database()
+
+    def _initialize_database(self):
+        """Open the cache database and create the schema"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self.logger.info(f"Embedding cache opened: {self.path}")
+
+    @staticmethod
+    def _pack(vector: Iterable[float]) -> bytes:
+        return array('f', vector).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes) -> List[float]:
+        vector = array('f')
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, model: str, text_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Get cached embeddings for the given content hashes, keyed by hash"""
+        wanted = list(dict.fromkeys(text_hashes))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for start in range(0, len(wanted), _SQLITE_PARAM_CHUNK):
+                chunk = wanted[start:start + _SQLITE_PARAM_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = self._unpack(blob)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]):
+        """Store embeddings keyed by content hash, evicting least recently used entries"""
+        if not embeddings:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(model, text_hash, self._pack(vector), now) for text_hash, vector in embeddings.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries above max_entries (lock must be held)"""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+            self.logger.debug(f"Evicted {excess} embeddings from cache")
+
+    def clear(self):
+        """Remove all cached embeddings"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'enabled': True,
+            'path': self.path,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None
+        }
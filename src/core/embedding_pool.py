@@ -0,0 +1,113 @@
+"""
+Embedding Worker Pool
+Multiprocess SentenceTransformer encoding so bulk ingestion uses every CPU core
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List
+
+# Model loaded once per worker process by _initialize_worker
+_worker_model = None
+
+
+def _initialize_worker(model_name: str, torch_threads: int):
+    """Load the embedding model in a worker process"""
+    global _worker_model
+    try:
+        # Split the cores between workers instead of oversubscribing them
+        import torch
+        torch.set_num_threads(torch_threads)
+    except Exception:
+        pass
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_in_worker(texts: List[str], batch_size: int) -> List[List[float]]:
+    """Encode one mini-batch in a worker process"""
+    vectors = _worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    return [vector.tolist() for vector in vectors]
+
+
+class EmbeddingWorkerPool:
+    """Process pool that encodes mini-batches with a bounded number of pending tasks"""
+
+    def __init__(self, model_name: str, workers: int, max_pending: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.workers = workers
+        self.max_pending = max_pending or workers * 2
+        self.tasks_completed = 0
+        self._in_flight = 0
+        self._counter_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        # Spawned workers avoid inheriting torch thread pools and open handles
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_initialize_worker,
+            initargs=(model_name, torch_threads)
+        )
+        self.logger.info(
+            f"Started embedding worker pool: {workers} workers, "
+            f"{torch_threads} torch threads each, {self.max_pending} pending tasks max"
+        )
+
+    def _release(self, future: Future):
+        """Free a queue slot once a task finishes or is cancelled"""
+        try:
+            with self._counter_lock:
+                self._in_flight -= 1
+                # exception() raises CancelledError for a cancelled future
+                if not future.cancelled() and future.exception() is None:
+                    self.tasks_completed += 1
+        finally:
+            self._slots.release()
+
+    def encode_batches(self, batches: List[List[str]], batch_size: int) -> List[List[List[float]]]:
+        """Encode mini-batches across the workers, returning vectors in input order
+
+        Submission blocks while max_pending tasks are outstanding, so a large
+        ingest cannot queue unbounded work or memory ahead of the workers.
+        """
+        futures = []
+        try:
+            for batch in batches:
+                self._slots.acquire()
+                with self._counter_lock:
+                    self._in_flight += 1
+                try:
+                    future = self._executor.submit(_encode_in_worker, batch, batch_size)
+                except Exception:
+                    with self._counter_lock:
+                        self._in_flight -= 1
+                    self._slots.release()
+                    raise
+                future.add_done_callback(self._release)
+                futures.append(future)
+
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        return {
+            'enabled': True,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'in_flight': self._in_flight,
+            'tasks_completed': self.tasks_completed
+        }
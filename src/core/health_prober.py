@@ -0,0 +1,123 @@
+"""
+Health Prober
+Background refresh of a service's health state so health endpoints only read it
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+class HealthProber:
+    """Runs a probe function on an interval and keeps its latest result
+
+    The probe returns a dict with a 'status' key. While it reports anything
+    other than 'healthy' the wait between probes doubles, up to
+    max_interval, so a service that is down is not polled at full rate; the
+    first healthy result resets it to interval.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], Dict[str, Any]], interval: float = 30.0,
+                 max_interval: float = 300.0):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.probe = probe
+        self.interval = interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._failures = 0
+        self._next_delay = interval
+
+    def refresh(self) -> Dict[str, Any]:
+        """Run the probe now and store its result"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            try:
+                state = self.probe()
+            except Exception as e:
+                state = {'status': 'error', 'error': str(e)}
+            state.setdefault('timestamp', datetime.utcnow().isoformat())
+            state['probe_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+            with self._lock:
+                previous = self._state['status'] if self._state else None
+                if state['status'] == 'healthy':
+                    self._failures = 0
+                    self._next_delay = self.interval
+                else:
+                    self._failures += 1
+                    self._next_delay = min(self.interval * (2 ** self._failures), self.max_interval)
+                self._state = state
+                self._checked_at = time.monotonic()
+
+            if state['status'] != previous:
+                log = self.logger.info if state['status'] == 'healthy' else self.logger.warning
+                log(f"{self.name} health changed: {previous} -> {state['status']}")
+            return state
+
+    def _due_in(self) -> float:
+        """Seconds until the next probe is due (lock must be held)"""
+        if self._checked_at is None:
+            return 0.0
+        return self._next_delay - (time.monotonic() - self._checked_at)
+
+    def state(self) -> Dict[str, Any]:
+        """Get the last probed state
+        
+        Without the background thread the probe runs here, at most once per
+        probe interval.
+        """
+        with self._lock:
+            stale = self._due_in() <= 0
+        if stale and not self.running:
+            self.refresh()
+
+        with self._lock:
+            state, checked_at = self._state, self._checked_at
+            failures, next_delay = self._failures, self._next_delay
+        if state is None:
+            # The background thread has not finished its first probe
+            return {'status': 'unknown', 'timestamp': datetime.utcnow().isoformat()}
+
+        age = time.monotonic() - checked_at
+        return dict(
+            state,
+            checked_seconds_ago=round(age, 1),
+            next_probe_in=round(max(next_delay - age, 0), 1) if self.running else None,
+            consecutive_failures=failures
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                delay = max(self._due_in(), 0)
+            if self._stop.wait(delay):
+                return
+            self.refresh()
+
+    def start(self) -> bool:
+        """Start probing in a background thread"""
+        if self.running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-health", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,203 @@
+"""
+HNSW Tuning
+Replays a labeled query set against candidate HNSW settings and reports recall@k,
+latency percentiles and index memory
+
+Usage (from src/):
+    python -m core.hnsw_tuning queries.jsonl --m 8 16 32 --search-ef 10 50 100
+
+Each line of the query file is {"query": "...", "relevant_ids": ["doc-1", ...]}.
+Queries without relevant_ids are scored against exact nearest neighbours.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    """Load the labeled query set"""
+    queries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+
+def load_corpus(service):
+    """Get every (id, embedding) pair in the active collection"""
+    import numpy as np
+
+    ids = []
+    vectors = []
+    page_size = service._write_batch_size()
+    offset = 0
+    while True:
+        page = service.collection.get(limit=page_size, offset=offset, include=['embeddings'])
+        ids.extend(page['ids'])
+        vectors.extend(page['embeddings'])
+        if len(page['ids']) < page_size:
+            break
+        offset += page_size
+    return ids, np.asarray(vectors, dtype=np.float32)
+
+
+def exact_neighbours(corpus, query_vectors, k: int, space: str) -> List[List[int]]:
+    """Brute-force nearest neighbour indexes, used as ground truth for unlabeled queries"""
+    import numpy as np
+
+    if space == 'cosine':
+        corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        query_vectors = query_vectors / np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+        distances = -query_vectors @ corpus.T
+    elif space == 'ip':
+        distances = -query_vectors @ corpus.T
+    else:
+        distances = (
+            (query_vectors ** 2).sum(axis=1, keepdims=True)
+            - 2 * query_vectors @ corpus.T
+            + (corpus ** 2).sum(axis=1)
+        )
+    return np.argsort(distances, axis=1)[:, :k].tolist()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def estimated_index_mb(count: int, dimension: int, m: int) -> float:
+    """Estimate hnswlib memory from vectors, level-0 links (2*M), link count and label per element"""
+    per_element = dimension * 4 + 2 * m * 4 + 4 + 8
+    return round(count * per_element / (1024 * 1024), 2)
+
+
+def directory_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return round(total / (1024 * 1024), 2)
+
+
+def evaluate(service, ids: List[str], corpus, query_vectors, truths: List[set],
+             hnsw: Dict[str, Any], k: int) -> Dict[str, Any]:
+    """Build an index with one candidate setting and replay the queries against it"""
+    import chromadb
+    from chromadb.config import Settings
+
+    workdir = tempfile.mkdtemp(prefix='hnsw-tuning-')
+    try:
+        client = chromadb.PersistentClient(path=workdir, settings=Settings(anonymized_telemetry=False))
+        collection = client.create_collection(
+            name='hnsw_tuning',
+            metadata=service.collection_metadata(service.collection_model, hnsw)
+        )
+
+        started = time.perf_counter()
+        write_size = service._write_batch_size()
+        for start in range(0, len(ids), write_size):
+            collection.add(
+                ids=ids[start:start + write_size],
+                embeddings=corpus[start:start + write_size].tolist()
+            )
+        build_seconds = time.perf_counter() - started
+
+        # Warm up so the first timed query does not pay for loading the index
+        collection.query(query_embeddings=[query_vectors[0].tolist()], n_results=k, include=[])
+
+        latencies = []
+        recalls = []
+        for vector, truth in zip(query_vectors, truths):
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[vector.tolist()], n_results=k, include=[])
+            latencies.append((time.perf_counter() - started) * 1000)
+            if truth:
+                found = set(result['ids'][0])
+                recalls.append(len(found & truth) / min(len(truth), k))
+
+        return {
+            **hnsw,
+            f'recall@{k}': round(sum(recalls) / len(recalls), 4) if recalls else None,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'build_seconds': round(build_seconds, 2),
+            'estimated_index_mb': estimated_index_mb(len(ids), corpus.shape[1], hnsw['M']),
+            'disk_mb': directory_mb(workdir)
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def tune(service, queries: List[Dict[str, Any]], k: int, grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Evaluate every combination in grid against the active collection's embeddings"""
+    import numpy as np
+
+    ids, corpus = load_corpus(service)
+    if not ids:
+        raise ValueError("The active collection is empty")
+    query_vectors = np.asarray(service._embed_queries([q['query'] for q in queries]), dtype=np.float32)
+    logger.info(f"Tuning against {len(ids)} documents and {len(queries)} queries")
+
+    results = []
+    for space in grid['space']:
+        exact = exact_neighbours(corpus, query_vectors, k, space)
+        truths = [
+            set(q['relevant_ids']) if q.get('relevant_ids') else {ids[i] for i in exact[n]}
+            for n, q in enumerate(queries)
+        ]
+        for m, construction_ef, search_ef in itertools.product(grid['M'], grid['construction_ef'], grid['search_ef']):
+            hnsw = {'space': space, 'M': m, 'construction_ef': construction_ef, 'search_ef': search_ef}
+            result = evaluate(service, ids, corpus, query_vectors, truths, hnsw, k)
+            logger.info(f"Evaluated {hnsw}")
+            results.append(result)
+    return results
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Compare HNSW settings on the current corpus")
+    parser.add_argument('queries', help="JSONL file of {query, relevant_ids}")
+    parser.add_argument('-k', type=int, default=config.rag['MAX_RESULTS'])
+    parser.add_argument('--space', nargs='+', default=[config.chromadb['HNSW_SPACE']])
+    parser.add_argument('--m', nargs='+', type=int, default=[config.chromadb['HNSW_M']])
+    parser.add_argument('--construction-ef', nargs='+', type=int, default=[config.chromadb['HNSW_CONSTRUCTION_EF']])
+    parser.add_argument('--search-ef', nargs='+', type=int, default=[config.chromadb['HNSW_SEARCH_EF']])
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from .chromadb_service import get_chromadb_service
+
+    results = tune(get_chromadb_service(), load_queries(args.queries), args.k, {
+        'space': args.space,
+        'M': args.m,
+        'construction_ef': args.construction_ef,
+        'search_ef': args.search_ef
+    })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print("  ".join(f"{column:>18}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>18}" for column in columns))
+
+
+if __name__ == '__main__':
+    main()
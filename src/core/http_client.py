@@ -0,0 +1,179 @@
+"""
+HTTP Client
+Pooled keep-alive HTTP session with jittered retries and a circuit breaker
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+Timeout = Union[float, Tuple[float, float]]
+
+# Responses that mean the server is struggling rather than that the request was wrong
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+def _never_sent(error: requests.exceptions.ConnectionError) -> bool:
+    """Check whether a connection error happened before the request reached the server"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Circuit breaker open; retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail immediately. Once reset_timeout has passed a single trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def allow(self) -> float:
+        """Return 0 if a call may proceed, else the seconds until the next trial"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining <= 0 and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return 0.0
+            self._stats['rejected'] += 1
+            return max(remaining, 1.0)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    self._stats['opened'] += 1
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def stats(self) -> Dict[str, Any]:
+        """Get breaker statistics"""
+        state = self.state
+        with self._lock:
+            return dict(self._stats, state=state, consecutive_failures=self._failures)
+
+
+class PooledHttpClient:
+    """requests.Session bound to one base URL, shared by every caller
+
+    Connections are kept alive in a pool sized for the web server's worker
+    threads. Idempotent requests are retried with full-jitter exponential
+    backoff on connection errors, timeouts and 502/503/504. Other requests
+    are only retried when the connection could not be established, so the
+    server never saw them. Failures feed the circuit breaker; while it is
+    open, requests raise CircuitOpenError without touching the network.
+    """
+
+    def __init__(self, base_url: str, pool_size: int = 10, retries: int = 2, backoff: float = 0.5,
+                 max_backoff: float = 5.0, breaker: CircuitBreaker = None):
+        self.logger = logging.getLogger(__name__)
+        self.base_url = base_url.rstrip('/')
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        # Retries are handled here so they can be jittered and counted by the breaker
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _sleep_before_retry(self, attempt: int):
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def request(self, method: str, path: str, timeout: Timeout, idempotent: bool = None,
+                **kwargs) -> requests.Response:
+        """Send a request through the pool, retrying and tripping the breaker as configured"""
+        if idempotent is None:
+            idempotent = method.upper() in ('GET', 'HEAD', 'OPTIONS')
+        url = f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            retry_in = self.breaker.allow()
+            if retry_in:
+                raise CircuitOpenError(retry_in)
+
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                self.breaker.record_failure()
+                error, retryable = e, idempotent or _never_sent(e)
+            except requests.exceptions.Timeout as e:
+                self.breaker.record_failure()
+                error, retryable = e, idempotent
+            except requests.exceptions.RequestException:
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code in RETRYABLE_STATUS:
+                    self.breaker.record_failure()
+                    if not idempotent or attempt >= self.retries:
+                        return response
+                    error, retryable = None, True
+                    response.close()
+                else:
+                    self.breaker.record_success()
+                    return response
+
+            if not retryable or attempt >= self.retries:
+                raise error
+            self.logger.warning(f"{method} {path} failed ({error or 'server busy'}); retry {attempt + 1}/{self.retries}")
+            self._sleep_before_retry(attempt)
+            attempt += 1
+
+    def get(self, path: str, timeout: Timeout, **kwargs) -> requests.Response:
+        return self.request('GET', path, timeout, **kwargs)
+
+    def post(self, path: str, timeout: Timeout, idempotent: bool = False, **kwargs) -> requests.Response:
+        return self.request('POST', path, timeout, idempotent=idempotent, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get client statistics"""
+        return {'base_url': self.base_url, 'retries': self.retries, 'breaker': self.breaker.stats()}
+
+    def close(self):
+        self.session.close()
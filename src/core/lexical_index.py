@@ -0,0 +1,194 @@
+"""
+Lexical Index
+In-memory BM25 inverted index for exact-token retrieval of network documents
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# IP addresses/prefixes, interface-style names (Gi0/1, Loopback0, Po1.100) and plain words
+TOKEN_PATTERN = re.compile(
+    r"\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?"
+    r"|[a-z][a-z\-]*\d+(?:[/.:]\d+)*"
+    r"|\w+"
+)
+
+# Common Cisco interface abbreviations mapped to their full names
+INTERFACE_ABBREVIATIONS = {
+    'gi': 'gigabitethernet',
+    'te': 'tengigabitethernet',
+    'fa': 'fastethernet',
+    'eth': 'ethernet',
+    'et': 'ethernet',
+    'lo': 'loopback',
+    'po': 'port-channel',
+    'se': 'serial',
+    'tu': 'tunnel',
+    'vl': 'vlan',
+}
+
+INTERFACE_PATTERN = re.compile(r"^([a-z][a-z\-]*?)(\d+(?:[/.:]\d+)*)$")
+
+# Words that, together with numeric tokens, mark a query as an identifier lookup
+IDENTIFIER_KEYWORDS = {
+    'as', 'asn', 'acl', 'access-list', 'vlan', 'interface', 'int', 'vrf',
+    'bgp', 'ospf', 'eigrp', 'prefix-list', 'route-map', 'neighbor', 'area',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, keeping network identifiers intact"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        match = INTERFACE_PATTERN.match(token)
+        if match and match.group(1) in INTERFACE_ABBREVIATIONS:
+            token = INTERFACE_ABBREVIATIONS[match.group(1)] + match.group(2)
+        terms.append(token)
+        # Let a bare address match a prefix written with a mask length
+        if '/' in token and token[0].isdigit() and token.count('.') == 3:
+            terms.append(token.split('/')[0])
+    return terms
+
+
+def looks_like_identifier(query: str) -> bool:
+    """Check whether a query is a short lookup of literal identifiers"""
+    words = query.strip().split()
+    if not words or len(words) > 3:
+        return False
+    has_digits = False
+    for word in words:
+        if any(ch.isdigit() for ch in word):
+            has_digits = True
+        elif word.lower() not in IDENTIFIER_KEYWORDS:
+            return False
+    return has_digits
+
+
+def matches_filter(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style metadata filter against a metadata dict"""
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == '$eq':
+                    ok = value == operand
+                elif operator == '$ne':
+                    ok = value != operand
+                elif operator == '$in':
+                    ok = value in operand
+                elif operator == '$nin':
+                    ok = value not in operand
+                elif operator in ('$gt', '$gte', '$lt', '$lte'):
+                    if value is None:
+                        return False
+                    ok = {
+                        '$gt': value > operand,
+                        '$gte': value >= operand,
+                        '$lt': value < operand,
+                        '$lte': value <= operand,
+                    }[operator]
+                else:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if not ok:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+class BM25Index:
+    """Thread-safe BM25 inverted index keyed by document id"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing any previous version"""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, count in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            length = sum(counts.values())
+            self._doc_lengths[doc_id] = length
+            self._doc_terms[doc_id] = tuple(counts)
+            self._metadata[doc_id] = dict(metadata or {})
+            self._total_length += length
+
+    def remove(self, doc_id: str):
+        """Remove a document from the index"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        self._metadata.pop(doc_id, None)
+
+    def clear(self):
+        """Remove all documents"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_lengths.clear()
+            self._doc_terms.clear()
+            self._metadata.clear()
+            self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def search(self, query: str, n_results: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Get the top (doc_id, score) pairs for a query, best first"""
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not terms or not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            if where:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if matches_filter(self._metadata.get(doc_id, {}), where)
+                }
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
@@ -5,11 +5,16 @@ Handles interactions with the Ollama LLM for network automation tasks
 
 import logging
 import json
-import requests
-from typing import Dict, List, Optional, Any
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from datetime import datetime
 
+from .cache import LRUCache
 from .config import config
+from .health_prober import HealthProber
+from .http_client import CircuitBreaker, PooledHttpClient
+from .response_cache import ResponseCache, response_key
+from .service_registry import registry
 
 
 class OllamaService:
@@ -21,13 +26,62 @@ class OllamaService:
         self.timeout = config.ollama['TIMEOUT']
         self.logger = logging.getLogger(__name__)
         
-        # Verify connection
-        self._verify_connection()
+        # One keep-alive pool for all callers; the breaker makes calls fail fast while Ollama is down
+        self.client = PooledHttpClient(
+            self.base_url,
+            pool_size=config.ollama['POOL_SIZE'],
+            retries=config.ollama['RETRIES'],
+            backoff=config.ollama['RETRY_BACKOFF'],
+            breaker=CircuitBreaker(config.ollama['BREAKER_THRESHOLD'], config.ollama['BREAKER_RESET_SECONDS'])
+        )
+        connect_timeout = config.ollama['CONNECT_TIMEOUT']
+        self.timeouts = {
+            'version': (connect_timeout, 5),
+            'tags': (connect_timeout, config.ollama['METADATA_TIMEOUT']),
+            'generate': (connect_timeout, self.timeout),
+            'chat': (connect_timeout, self.timeout)
+        }
+        
+        self.response_cache = None
+        self._initialize_response_cache()
+        
+        # /api/tags is read by page renders and model checks; one listing serves them all for a while
+        self._model_list = LRUCache(1, ttl=config.ollama['MODEL_LIST_TTL'])
+        
+        # Health is probed in the background, starting immediately, and
+        # health_check only reads the latest result ('unknown' until the first
+        # probe lands), so constructing the service never waits on Ollama
+        self.health = HealthProber(
+            'ollama', self._probe,
+            interval=config.ollama['HEALTH_PROBE_INTERVAL'],
+            max_interval=config.ollama['HEALTH_PROBE_MAX_INTERVAL']
+        )
+        if config.ollama['HEALTH_PROBE_ENABLED']:
+            self.health.start()
+    
+    def _initialize_response_cache(self):
+        """Initialize the persistent response cache"""
+        if not config.ollama['RESPONSE_CACHE_ENABLED']:
+            return
+        try:
+            self.response_cache = ResponseCache(
+                config.ollama['RESPONSE_CACHE_PATH'],
+                max_entries=config.ollama['RESPONSE_CACHE_MAX_ENTRIES'],
+                ttl=config.ollama['RESPONSE_CACHE_TTL']
+            )
+        except Exception as e:
+            # The cache only saves work, so run without it rather than fail
+            self.logger.warning(f"Response cache unavailable, continuing without it: {e}")
+            self.response_cache = None
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get response cache statistics"""
+        return self.response_cache.stats() if self.response_cache else {'enabled': False}
     
     def _verify_connection(self) -> bool:
         """Verify connection to Ollama service"""
         try:
-            response = requests.get(f"{self.base_url}/api/version", timeout=5)
+            response = self.client.get('/api/version', self.timeouts['version'])
             if response.status_code == 200:
                 version_info = response.json()
                 self.logger.info(f"Connected to Ollama version: {version_info.get('version', 'unknown')}")
@@ -39,13 +93,19 @@ class OllamaService:
             self.logger.error(f"Error connecting to Ollama: {e}")
             return False
     
-    def list_models(self) -> List[Dict[str, Any]]:
-        """Get list of available models"""
+    def list_models(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Get list of available models, cached for MODEL_LIST_TTL seconds"""
+        if not refresh:
+            models = self._model_list.get('models')
+            if models is not None:
+                return models
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=self.timeout)
+            response = self.client.get('/api/tags', self.timeouts['tags'])
             if response.status_code == 200:
                 data = response.json()
-                return data.get('models', [])
+                models = data.get('models', [])
+                self._model_list.set('models', models)
+                return models
             else:
                 self.logger.error(f"Failed to list models: HTTP {response.status_code}")
                 return []
@@ -68,11 +128,31 @@ class OllamaService:
         model: str = None,
         system_prompt: str = None,
         temperature: float = 0.7,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        cache: bool = False
     ) -> Dict[str, Any]:
-        """Generate a response from the LLM"""
+        """Generate a response from the LLM
+        
+        With cache, a successful response is stored and an identical request
+        (model, system prompt, prompt and options) is answered from the
+        response cache. Only use it for prompts whose answer may be reused.
+        """
         if model is None:
             model = self.model
+        options = {
+            "temperature": temperature,
+            "num_predict": max_tokens
+        }
+        
+        cache_key = None
+        if cache and self.response_cache is not None:
+            cache_key = response_key(model, system_prompt, prompt, options)
+            try:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return dict(cached, cached=True, timestamp=datetime.utcnow().isoformat())
+            except Exception as e:
+                self.logger.warning(f"Response cache lookup failed: {e}")
             
         try:
             # Prepare the request payload
@@ -80,10 +160,7 @@ class OllamaService:
                 "model": model,
                 "prompt": prompt,
                 "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
+                "options": options
             }
             
             # Add system prompt if provided
@@ -91,23 +168,29 @@ class OllamaService:
                 payload["system"] = system_prompt
             
             # Make the request
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=self.timeout
-            )
+            started = time.perf_counter()
+            response = self.client.post('/api/generate', self.timeouts['generate'], json=payload)
             
             if response.status_code == 200:
                 result = response.json()
-                return {
+                generated = {
                     "success": True,
                     "response": result.get("response", ""),
                     "model": model,
                     "prompt_tokens": result.get("prompt_eval_count", 0),
                     "completion_tokens": result.get("eval_count", 0),
                     "total_duration": result.get("total_duration", 0),
+                    "cached": False,
                     "timestamp": datetime.utcnow().isoformat()
                 }
+                if cache_key is not None:
+                    # Ollama reports durations in nanoseconds
+                    duration = generated["total_duration"] / 1e9 or time.perf_counter() - started
+                    try:
+                        self.response_cache.put(cache_key, model, generated, duration)
+                    except Exception as e:
+                        self.logger.warning(f"Response cache store failed: {e}")
+                return generated
             else:
                 self.logger.error(f"Ollama generation failed: HTTP {response.status_code}")
                 return {
@@ -146,11 +229,7 @@ class OllamaService:
                 }
             }
             
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=self.timeout
-            )
+            response = self.client.post('/api/chat', self.timeouts['chat'], json=payload)
             
             if response.status_code == 200:
                 result = response.json()
@@ -179,7 +258,113 @@ class OllamaService:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
-    def analyze_network_config(self, config_text: str) -> Dict[str, Any]:
+    def _stream(self, endpoint: str, payload: Dict[str, Any],
+                content: Callable[[Dict[str, Any]], str]) -> Iterator[Dict[str, Any]]:
+        """Consume Ollama's NDJSON stream, yielding token events and a final done or error event
+        
+        The read timeout applies between streamed lines, not to the whole
+        completion. Closing the generator early closes the connection, which
+        makes Ollama stop generating.
+        """
+        model = payload['model']
+        started = time.perf_counter()
+        first_token_ms = None
+        parts = []
+        try:
+            response = self.client.post(f'/api/{endpoint}', self.timeouts[endpoint], json=payload, stream=True)
+            with response:
+                if response.status_code != 200:
+                    self.logger.error(f"Ollama {endpoint} stream failed: HTTP {response.status_code}")
+                    yield {
+                        "type": "error",
+                        "error": f"HTTP {response.status_code}: {response.text}",
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
+                    return
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if 'error' in chunk:
+                        raise RuntimeError(chunk['error'])
+                    
+                    token = content(chunk)
+                    if token:
+                        if first_token_ms is None:
+                            first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+                        parts.append(token)
+                        yield {"type": "token", "content": token}
+                    
+                    if chunk.get('done'):
+                        yield {
+                            "type": "done",
+                            "success": True,
+                            "response": ''.join(parts),
+                            "model": model,
+                            "prompt_tokens": chunk.get("prompt_eval_count", 0),
+                            "completion_tokens": chunk.get("eval_count", 0),
+                            "total_duration": chunk.get("total_duration", 0),
+                            "time_to_first_token_ms": first_token_ms,
+                            "timestamp": datetime.utcnow().isoformat()
+                        }
+                        return
+            
+            raise RuntimeError("Stream ended before completion")
+            
+        except Exception as e:
+            self.logger.error(f"Error streaming {endpoint} response: {e}")
+            yield {
+                "type": "error",
+                "error": str(e),
+                "response": ''.join(parts),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+    
+    def stream_response(
+        self,
+        prompt: str,
+        model: str = None,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a response from the LLM token by token"""
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+        if system_prompt:
+            payload["system"] = system_prompt
+        
+        return self._stream('generate', payload, lambda chunk: chunk.get("response", ""))
+    
+    def stream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a chat completion token by token"""
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": True,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+        
+        return self._stream('chat', payload, lambda chunk: chunk.get("message", {}).get("content", ""))
+    
+    def analyze_network_config(self, config_text: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """Analyze network configuration using LLM"""
         system_prompt = """You are a network engineer AI assistant specializing in Cisco network configurations. 
         Analyze the provided configuration and identify:
@@ -202,10 +387,12 @@ Provide a detailed analysis including any issues found and recommendations."""
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.3,  # Lower temperature for more consistent analysis
-            max_tokens=1500
+            max_tokens=1500,
+            cache=not bypass_cache
         )
     
-    def generate_network_command(self, task_description: str, device_type: str = "cisco_ios") -> Dict[str, Any]:
+    def generate_network_command(self, task_description: str, device_type: str = "cisco_ios",
+                                 bypass_cache: bool = False) -> Dict[str, Any]:
         """Generate network commands for a specific task"""
         system_prompt = f"""You are a network automation expert. Generate {device_type} commands for network tasks.
         Always provide:
@@ -224,10 +411,12 @@ Please provide the commands in a structured format with explanations."""
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.2,  # Very low temperature for command generation
-            max_tokens=800
+            max_tokens=800,
+            cache=not bypass_cache
         )
     
-    def troubleshoot_network_issue(self, issue_description: str, device_logs: str = "") -> Dict[str, Any]:
+    def troubleshoot_network_issue(self, issue_description: str, device_logs: str = "",
+                                   bypass_cache: bool = False) -> Dict[str, Any]:
         """Help troubleshoot network issues"""
         system_prompt = """You are a senior network troubleshooting expert. Analyze network issues and provide:
         1. Possible root causes
@@ -248,52 +437,40 @@ Please provide troubleshooting guidance."""
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.4,
-            max_tokens=1200
+            max_tokens=1200,
+            cache=not bypass_cache
         )
     
+    def _probe(self) -> Dict[str, Any]:
+        """Check that Ollama answers and the configured model is installed"""
+        if not self._verify_connection():
+            return {
+                "status": "unhealthy",
+                "error": "Cannot connect to Ollama service",
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        
+        available_models = [model['name'] for model in self.list_models(refresh=True)]
+        if self.model not in available_models:
+            return {
+                "status": "unhealthy",
+                "error": f"Model '{self.model}' not available",
+                "available_models": available_models,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        
+        return {
+            "status": "healthy",
+            "model": self.model,
+            "base_url": self.base_url,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
     def health_check(self) -> Dict[str, Any]:
-        """Perform health check of the Ollama service"""
+        """Get the health of the Ollama service from the latest background probe"""
         try:
-            # Check connection
-            if not self._verify_connection():
-                return {
-                    "status": "unhealthy",
-                    "error": "Cannot connect to Ollama service",
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+            return dict(self.health.state(), circuit_breaker=self.client.breaker.stats())
             
-            # Check if model is available
-            if not self.is_model_available():
-                return {
-                    "status": "unhealthy",
-                    "error": f"Model '{self.model}' not available",
-                    "available_models": [m['name'] for m in self.list_models()],
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            
-            # Test generation with a simple prompt
-            test_result = self.generate_response(
-                prompt="Hello, please respond with 'OK' to confirm you're working.",
-                temperature=0.1,
-                max_tokens=10
-            )
-            
-            if test_result["success"]:
-                return {
-                    "status": "healthy",
-                    "model": self.model,
-                    "base_url": self.base_url,
-                    "test_response": test_result["response"][:50],
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            else:
-                return {
-                    "status": "unhealthy",
-                    "error": "Test generation failed",
-                    "details": test_result.get("error", "Unknown error"),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
         except Exception as e:
             return {
                 "status": "error",
@@ -302,5 +479,12 @@ Please provide troubleshooting guidance."""
             }
 
 
-# Global instance
-ollama_service = OllamaService() 
\ No newline at end of file
+# Global instance, built on first use or by registry warmup
+registry.register('ollama', OllamaService)
+ollama_service = registry.proxy('ollama')
+
+
+# Dependency function
+def get_ollama_service() -> OllamaService:
+    """Get Ollama service instance"""
+    return registry.get('ollama') 
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Response Cache
+Persistent cache of LLM responses for deterministic prompts
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def response_key(model: str, system_prompt: Optional[str], prompt: str, options: Dict[str, Any]) -> str:
+    """Get the cache key for a generation request"""
+    options_hash = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+    payload = json.dumps([model, system_prompt or '', prompt, options_hash])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with a TTL and LRU eviction
+
+    Each entry remembers how long the model took to produce it, so hits
+    can be reported as generation time saved.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl: float = 7 * 24 * 3600):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._initialize_database()
+
+    def _initialize_database(self):
+        """Open the cache database and create the schema"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,
+                duration REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+        self.logger.info(f"Response cache opened: {self.path}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached result, or None if missing or older than the TTL"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, duration, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            result, duration, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_seconds += duration
+
+        return json.loads(result)
+
+    def put(self, key: str, model: str, result: Dict[str, Any], duration: float):
+        """Store a result that took duration seconds to generate, evicting least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, result, duration, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, json.dumps(result), duration, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used above max_entries (lock must be held)"""
+        if self.ttl:
+            cursor = self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            self.expired += cursor.rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE rowid IN "
+                "(SELECT rowid FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+            self.logger.debug(f"Evicted {excess} responses from cache")
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'enabled': True,
+            'path': self.path,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'saved_seconds': round(self.saved_seconds, 1)
+        }
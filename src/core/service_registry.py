@@ -0,0 +1,125 @@
+"""
+Service Registry
+Lazy construction and background warmup of the shared core services
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ServiceRegistry:
+    """Registry that builds shared services on first use or in a warmup thread"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._service_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register a factory that builds the named service"""
+        with self._lock:
+            self._factories[name] = factory
+            self._service_locks.setdefault(name, threading.Lock())
+            self._states.setdefault(name, {'state': 'cold'})
+
+    def get(self, name: str) -> Any:
+        """Get the named service, constructing it if needed"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Service not registered: {name}")
+
+        # Per-service lock so slow services do not block each other
+        with self._service_locks[name]:
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            started = time.perf_counter()
+            self._states[name] = {
+                'state': 'warming',
+                'started_at': datetime.utcnow().isoformat()
+            }
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._states[name] = {
+                    'state': 'error',
+                    'error': str(e),
+                    'failed_at': datetime.utcnow().isoformat()
+                }
+                self.logger.error(f"Failed to initialize service {name}: {e}")
+                raise
+
+            self._instances[name] = instance
+            self._states[name] = {
+                'state': 'ready',
+                'init_seconds': round(time.perf_counter() - started, 3),
+                'ready_at': datetime.utcnow().isoformat()
+            }
+            self.logger.info(f"Service ready: {name} ({self._states[name]['init_seconds']}s)")
+            return instance
+
+    def is_ready(self, name: str) -> bool:
+        """Check whether the named service has been constructed"""
+        return name in self._instances
+
+    def proxy(self, name: str) -> "LazyService":
+        """Get a proxy that resolves the named service on first use"""
+        return LazyService(self, name)
+
+    def warmup(self, names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """Construct services ahead of first use, optionally in a daemon thread"""
+        names = list(names or self._factories)
+
+        def _warm():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    # Already logged; the next get() retries construction
+                    pass
+
+        if not background:
+            _warm()
+            return None
+
+        thread = threading.Thread(target=_warm, name="service-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Get the warmup state of every registered service"""
+        return {name: dict(state) for name, state in self._states.items()}
+
+
+class LazyService:
+    """Proxy that forwards attribute access to a registry-managed service"""
+
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry: ServiceRegistry, name: str):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._registry.get(self._name), item)
+
+    def __setattr__(self, key: str, value: Any):
+        setattr(self._registry.get(self._name), key, value)
+
+    def __repr__(self) -> str:
+        state = self._registry.status().get(self._name, {}).get('state', 'unknown')
+        return f"<LazyService(name='{self._name}', state='{state}')>"
+
+
+# Global service registry
+registry = ServiceRegistry()
@@ -0,0 +1,51 @@
+"""
+Chunker
+Streaming, overlapping text chunking for document ingestion
+"""
+
+from typing import Iterable, Iterator
+
+from core.config import config
+
+
+def iter_chunks(pieces: Iterable[str], chunk_size: int = None, chunk_overlap: int = None) -> Iterator[str]:
+    """Yield overlapping chunks of at most chunk_size characters from a stream of text pieces
+
+    Pieces (file blocks, PDF pages) are consumed lazily, so only about one
+    piece plus one chunk is held in memory. Chunks end at the last line break
+    or space in their second half where there is one, so words and config
+    lines are not split.
+    """
+    chunk_size = chunk_size or config.rag['CHUNK_SIZE']
+    chunk_overlap = config.rag['CHUNK_OVERLAP'] if chunk_overlap is None else chunk_overlap
+    chunk_overlap = min(chunk_overlap, chunk_size // 2)
+
+    buffer = ''
+    # Characters at the start of the buffer already emitted as part of the previous chunk
+    emitted = 0
+
+    def next_end(start: int) -> int:
+        window_end = start + chunk_size
+        for separator in ('\n', ' '):
+            cut = buffer.rfind(separator, start + chunk_size // 2, window_end)
+            if cut != -1:
+                return cut + 1
+        return window_end
+
+    for piece in pieces:
+        if not piece:
+            continue
+        buffer += piece
+        start = 0
+        while len(buffer) - start > chunk_size:
+            end = next_end(start)
+            chunk = buffer[start:end]
+            if chunk.strip():
+                yield chunk
+            start = max(end - chunk_overlap, start + 1)
+            emitted = end - start
+        # Drop consumed text once per piece rather than once per chunk
+        buffer = buffer[start:]
+
+    if len(buffer) > emitted and buffer[emitted:].strip():
+        yield buffer
@@ -0,0 +1,195 @@
+"""
+Config Chunker
+Cisco IOS-aware chunking of configuration files on top-level stanzas
+"""
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.config import config
+from rag.chunker import iter_chunks
+
+# Top-level command prefixes mapped to a stanza type, most specific first
+STANZA_TYPES = [
+    ('interface ', 'interface'),
+    ('router bgp', 'bgp'),
+    ('router ospfv3', 'ospf'),
+    ('router ospf', 'ospf'),
+    ('router eigrp', 'eigrp'),
+    ('router isis', 'isis'),
+    ('router rip', 'rip'),
+    ('ip access-list', 'acl'),
+    ('ipv6 access-list', 'acl'),
+    ('access-list', 'acl'),
+    ('ip prefix-list', 'prefix_list'),
+    ('ipv6 prefix-list', 'prefix_list'),
+    ('route-map', 'route_map'),
+    ('ip route', 'static_route'),
+    ('ipv6 route', 'static_route'),
+    ('vrf definition', 'vrf'),
+    ('ip vrf', 'vrf'),
+    ('class-map', 'qos'),
+    ('policy-map', 'qos'),
+    ('crypto', 'crypto'),
+    ('line ', 'line'),
+    ('snmp-server', 'snmp'),
+    ('aaa ', 'aaa'),
+    ('username', 'aaa'),
+    ('ntp ', 'ntp'),
+    ('logging', 'logging'),
+    ('vlan', 'vlan'),
+    ('spanning-tree', 'spanning_tree'),
+    ('ip dhcp', 'dhcp'),
+    ('ip nat', 'nat'),
+    ('banner', 'banner'),
+]
+
+HOSTNAME_PATTERN = re.compile(r'^hostname\s+(\S+)', re.MULTILINE)
+
+# Lines that only occur in IOS-style configs, used to decide whether a file is one
+CONFIG_MARKERS = re.compile(
+    r'^(hostname \S+|interface \S+|router (ospf|bgp|eigrp|isis)\b|ip route \S+|'
+    r'version \d+\.\d+|service timestamps|line (con|vty) \d+|end)\s*$',
+    re.MULTILINE
+)
+
+# Lines read ahead looking for the hostname before stanzas are released without one
+HOSTNAME_LOOKAHEAD_LINES = 200
+
+
+def looks_like_ios_config(sample: str) -> bool:
+    """Check whether a text sample reads like an IOS running configuration"""
+    return len(CONFIG_MARKERS.findall(sample)) >= 3
+
+
+def stanza_type(header: str) -> str:
+    """Classify a top-level configuration line"""
+    lowered = header.lower()
+    for prefix, kind in STANZA_TYPES:
+        if lowered.startswith(prefix):
+            return kind
+    return 'global'
+
+
+def _stanza_metadata(header: str, kind: str, device: Optional[str]) -> Dict[str, Any]:
+    metadata = {'stanza_type': kind, 'stanza': header.strip()[:200]}
+    if device:
+        metadata['device'] = device
+    if kind == 'interface':
+        metadata['interface'] = header.split(None, 1)[1].strip() if ' ' in header.strip() else ''
+    return metadata
+
+
+def _split_stanza(lines: List[str], chunk_size: int) -> Iterator[str]:
+    """Split a stanza larger than chunk_size at child lines, repeating the header line"""
+    header, children = lines[0], lines[1:]
+    part: List[str] = [header]
+    size = len(header)
+    for line in children:
+        if size + len(line) > chunk_size and len(part) > 1:
+            yield ''.join(part)
+            part, size = [header], len(header)
+        if len(header) + len(line) > chunk_size:
+            # A single oversized line (certificate blob, long banner) falls back to plain
+            # chunking, after the lines before it and with the header on every piece
+            if len(part) > 1:
+                yield ''.join(part)
+                part, size = [header], len(header)
+            for piece in iter_chunks([line], max(chunk_size - len(header), chunk_size // 2)):
+                yield header + (piece if piece.endswith('\n') else piece + '\n')
+            continue
+        part.append(line)
+        size += len(line)
+    if len(part) > 1 or not children:
+        yield ''.join(part)
+
+
+def iter_config_chunks(lines: Iterable[str], device: Optional[str] = None,
+                       chunk_size: int = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (chunk, metadata) pairs from a stream of IOS configuration lines
+
+    Each top-level stanza (a line without indentation plus its indented
+    children) becomes one chunk. Consecutive one-line commands of the same
+    type, such as static routes, are grouped up to chunk_size. A hostname
+    line sets the device for following stanzas; stanzas seen before it are
+    held back briefly so they get the device name too.
+    """
+    chunk_size = chunk_size or config.rag['CHUNK_SIZE']
+    hostname_known = device is not None
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+    lines_seen = 0
+
+    stanza: List[str] = []
+    group: List[str] = []
+    group_kind: Optional[str] = None
+
+    def emit_stanza(stanza_lines: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        kind = stanza_type(stanza_lines[0])
+        metadata = _stanza_metadata(stanza_lines[0], kind, device)
+        for text in _split_stanza(stanza_lines, chunk_size):
+            yield text, metadata
+
+    def emit_group() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if group:
+            yield ''.join(group), _stanza_metadata(group[0], group_kind, device)
+
+    def release(items: Iterator[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if hostname_known or lines_seen > HOSTNAME_LOOKAHEAD_LINES:
+            yield from pending
+            pending.clear()
+            yield from items
+        else:
+            pending.extend(items)
+
+    def close_stanza() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Finish the current stanza, folding one-line commands into a group"""
+        nonlocal stanza, group, group_kind
+        if not stanza:
+            return
+        lines_, stanza = stanza, []
+        kind = stanza_type(lines_[0])
+        if len(lines_) == 1 and kind != 'interface':
+            if group and (kind != group_kind or sum(map(len, group)) + len(lines_[0]) > chunk_size):
+                yield from release(emit_group())
+                group = []
+            group.append(lines_[0])
+            group_kind = kind
+            return
+        if group:
+            yield from release(emit_group())
+            group = []
+        yield from release(emit_stanza(lines_))
+
+    for line in lines:
+        lines_seen += 1
+        if not line.endswith('\n'):
+            line += '\n'
+        stripped = line.strip()
+
+        if not stripped or (stripped in ('!', 'end') and not line[0].isspace()):
+            yield from close_stanza()
+            continue
+        if stripped == '!':
+            # An indented "!" ends a sub-block (e.g. address-family) inside the stanza
+            continue
+
+        if not line[0].isspace():
+            yield from close_stanza()
+            match = HOSTNAME_PATTERN.match(stripped)
+            if match:
+                device = match.group(1)
+                hostname_known = True
+                # Stanzas read before the hostname line belong to this device too
+                for _, metadata in pending:
+                    metadata['device'] = device
+            stanza = [line]
+        elif stanza:
+            stanza.append(line)
+        else:
+            # Indented text with no parent line is kept as its own stanza
+            stanza = [line]
+
+    yield from close_stanza()
+    if group:
+        pending.extend(emit_group())
+    yield from pending
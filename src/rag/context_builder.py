@@ -0,0 +1,209 @@
+"""
+Context Builder
+Token-budgeted, deduplicated context packing for RAG prompts
+"""
+
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from core.config import config
+from core.lexical_index import tokenize
+
+# Rough characters-per-token ratio for the Llama family tokenizers
+CHARS_PER_TOKEN = 4
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of prompt tokens for a text"""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+class ContextBuilder:
+    """Packs the most relevant, non-redundant lines of retrieved chunks into a token budget"""
+
+    def __init__(self, context_window: int = None, reserve_tokens: int = None,
+                 mmr_lambda: float = None, max_candidates: int = 300):
+        self.logger = logging.getLogger(__name__)
+        self.context_window = context_window or config.ollama['CONTEXT_WINDOW']
+        self.reserve_tokens = reserve_tokens if reserve_tokens is not None else config.rag['CONTEXT_RESERVE_TOKENS']
+        self.mmr_lambda = mmr_lambda if mmr_lambda is not None else config.rag['CONTEXT_MMR_LAMBDA']
+        self.max_candidates = max_candidates
+
+    def _split_units(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Split retrieved chunks into lines or sentences, linking indented lines to their header
+
+        An indented line (a config child line, a nested list item) records the
+        position of the nearest unindented line above it, so it is never shown
+        without the stanza or item it belongs to. Repeated lines are dropped
+        across all chunks, keyed on the header text and the line, since
+        overlapping chunks of one document repeat each other; " ip ospf 1
+        area 0" under two interfaces is still two different facts. A header
+        repeated in a later chunk is not packed again: the lines under it
+        attach to the first copy.
+        """
+        units = []
+        seen: Dict[Tuple[Optional[str], str], int] = {}
+        child_lines: Set[str] = set()
+        for rank, result in enumerate(results):
+            header: Optional[int] = None
+            for line in (result.get('content') or '').splitlines():
+                if not line.strip():
+                    continue
+                indented = line[:1].isspace()
+                if not indented:
+                    header = None
+                # Config lines stay whole; long prose lines are split into sentences
+                pieces = SENTENCE_SPLIT.split(line) if len(line) > 200 else [line]
+                for piece in pieces:
+                    text = piece.rstrip()
+                    normalized = ' '.join(text.lower().split())
+                    if len(normalized) < 3:
+                        continue
+                    parent = header if indented else None
+                    if indented and parent is None and normalized in child_lines:
+                        # Tail of a stanza whose header is in the overlap with an earlier chunk
+                        continue
+                    key = (units[parent]['normalized'] if parent is not None else None, normalized)
+                    if key in seen:
+                        if not indented and header is None:
+                            header = seen[key]
+                        continue
+
+                    seen[key] = len(units)
+                    if indented:
+                        child_lines.add(normalized)
+                    units.append({
+                        'text': text,
+                        'normalized': normalized,
+                        'terms': set(tokenize(text)),
+                        # Lines under a header from an earlier chunk are shown with it
+                        'source': units[parent]['source'] if parent is not None else result.get('id'),
+                        'rank': rank,
+                        'position': len(units),
+                        'parent': parent,
+                        'tokens': estimate_tokens(text) + 1
+                    })
+                    if not indented and header is None:
+                        header = units[-1]['position']
+        return units
+
+    @staticmethod
+    def _similarity(a: Set[str], b: Set[str]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    def _relevance(self, query_terms: Set[str], unit: Dict[str, Any]) -> float:
+        """Score a unit by query term overlap, boosted for higher-ranked chunks"""
+        overlap = len(query_terms & unit['terms'])
+        lexical = overlap / math.sqrt(len(unit['terms']) + 1) if query_terms else 0.0
+        # The small additive prior only orders lines that share no query terms
+        return lexical * (1 + 0.5 / (1 + unit['rank'])) + 0.05 / (1 + unit['rank'])
+
+    def _source_label(self, result: Dict[str, Any]) -> str:
+        metadata = result.get('metadata') or {}
+        return metadata.get('filename') or metadata.get('device') or result.get('id') or 'document'
+
+    def build(self, query: str, results: List[Dict[str, Any]], prompt_overhead: str = '',
+              budget_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Build a context string for query from search results within the token budget
+
+        prompt_overhead is the rest of the prompt (system text, question) whose
+        tokens count against the same context window.
+        """
+        if budget_tokens is None:
+            budget_tokens = (
+                self.context_window - self.reserve_tokens
+                - estimate_tokens(prompt_overhead) - estimate_tokens(query)
+            )
+        if budget_tokens <= 0 or not results:
+            return {'context': '', 'tokens': 0, 'units': 0, 'sources': []}
+
+        query_terms = set(tokenize(query))
+        units = self._split_units(results)
+        for unit in units:
+            unit['relevance'] = self._relevance(query_terms, unit)
+
+        included: Set[int] = set()
+        used_tokens = 0
+
+        def cost(unit: Dict[str, Any]) -> int:
+            """Tokens needed to add a unit, including its header if not already packed"""
+            parent = unit['parent']
+            if parent is None or parent in included:
+                return unit['tokens']
+            return unit['tokens'] + units[parent]['tokens']
+
+        def include(unit: Dict[str, Any]):
+            nonlocal used_tokens
+            used_tokens += cost(unit)
+            included.add(unit['position'])
+            if unit['parent'] is not None:
+                included.add(unit['parent'])
+
+        # Lines sharing query terms are packed first, by maximal marginal relevance:
+        # relevance traded against redundancy with what is already packed
+        matching = [unit for unit in units if unit['terms'] & query_terms]
+        candidates = sorted(matching, key=lambda unit: unit['relevance'], reverse=True)[:self.max_candidates]
+        redundancy = [0.0] * len(candidates)
+        remaining = set(range(len(candidates)))
+        while remaining:
+            best_index, best_score = None, None
+            for index in list(remaining):
+                unit = candidates[index]
+                if unit['position'] in included:
+                    # Already packed as the header of an earlier line
+                    remaining.discard(index)
+                    continue
+                if used_tokens + cost(unit) > budget_tokens:
+                    continue
+                score = self.mmr_lambda * unit['relevance'] - (1 - self.mmr_lambda) * redundancy[index]
+                if best_score is None or score > best_score:
+                    best_index, best_score = index, score
+            if best_index is None:
+                break
+            remaining.discard(best_index)
+            chosen = candidates[best_index]
+            include(chosen)
+            for index in remaining:
+                redundancy[index] = max(redundancy[index], self._similarity(candidates[index]['terms'], chosen['terms']))
+
+        # Leftover budget is filled with the remaining lines of the best-ranked chunks in order
+        for unit in sorted(units, key=lambda u: (u['rank'], u['position'])):
+            if unit['position'] not in included and used_tokens + cost(unit) <= budget_tokens:
+                include(unit)
+
+        # Each header is followed by its packed lines, wherever in the results they came from
+        selected = sorted(
+            (units[position] for position in included),
+            key=lambda unit: (unit['parent'] if unit['parent'] is not None else unit['position'], unit['position'])
+        )
+
+        # Present the packed lines grouped by source, in their original order
+        labels = {result.get('id'): self._source_label(result) for result in results}
+        sections = []
+        sources = []
+        for source in dict.fromkeys(unit['source'] for unit in sorted(selected, key=lambda u: u['rank'])):
+            lines = [unit['text'] for unit in selected if unit['source'] == source]
+            sections.append(f"[Source: {labels.get(source, source)}]\n" + "\n".join(lines))
+            sources.append(source)
+
+        context = "\n\n".join(sections)
+        self.logger.info(
+            f"Packed {len(selected)} of {len(units)} context lines "
+            f"into ~{used_tokens}/{budget_tokens} tokens"
+        )
+        return {
+            'context': context,
+            'tokens': used_tokens,
+            'units': len(selected),
+            'sources': sources
+        }
+
+
+# Global context builder instance
+context_builder = ContextBuilder()
@@ -3,138 +3,455 @@ Simple Document Processor
 Basic document ingestion for demo purposes
 """
 
+import hashlib
+import json
 import os
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import PyPDF2
-from docx import Document
 import uuid
 from datetime import datetime
 
 # Import services
 import sys
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'config'))
 
-from src.core.chromadb_service import chromadb_service
-from src.core.database import db_manager
+# Import via the same package path as the web app so both share one registry
+from core.chromadb_service import chromadb_service
+from core.config import config
+from core.database import db_manager
+from core.embedding_cache import content_hash
+from rag.chunker import iter_chunks
+from rag.config_chunker import iter_config_chunks, looks_like_ios_config
+from rag.file_extractors import iter_csv_rows, iter_docx_text, iter_xls_rows, iter_xlsx_rows
+from rag.ingest_manifest import IngestManifest
+from rag.pdf_extractor import pdf_extractor
 
 
 class DocumentProcessor:
     """Simple document processor for demo"""
     
+    # Characters read from a text file per block
+    READ_BLOCK_SIZE = 64 * 1024
+    
+    SUPPORTED_EXTENSIONS = {'.pdf', '.txt', '.md', '.cfg', '.conf', '.docx', '.xlsx', '.xls', '.csv'}
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.manifest = IngestManifest(config.rag['INGEST_MANIFEST_PATH'])
+        self._source_locks: Dict[str, threading.Lock] = {}
+        self._source_locks_guard = threading.Lock()
+    
+    def _source_lock(self, source: str) -> threading.Lock:
+        """Lock serializing work on one source path across upload jobs and the folder watcher"""
+        with self._source_locks_guard:
+            return self._source_locks.setdefault(source, threading.Lock())
+    
+    def _read_text_blocks(self, file_path: str) -> Iterator[str]:
+        """Stream a text file in fixed-size blocks"""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            while True:
+                block = file.read(self.READ_BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+    
+    def _file_hash(self, file_path: str) -> str:
+        """Get the sha256 of a file without reading it into memory"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
     
-    def process_text_file(self, file_path: str, metadata: Dict[str, Any] = None) -> bool:
-        """Process a text file"""
+    def _ingest_chunks(self, file_path: str, file_type: str,
+                       chunks: Iterator[Union[str, Tuple[str, Dict[str, Any]]]],
+                       metadata: Dict[str, Any], chunker: str = None, content_type: str = None,
+                       skipped: Optional[List[Any]] = None) -> bool:
+        """Embed a stream of chunks in bounded batches and record the document
+        
+        chunks yields text, or (text, metadata) pairs for chunkers that
+        attach per-chunk metadata. Files already ingested with the same
+        content are skipped; a copy of another ingested file is recorded as
+        an alias of its chunks. A changed file keeps its document id; only
+        chunks whose text is new are embedded, and chunks that no longer
+        occur are deleted.
+        
+        skipped is filled by the extractor with parts of the file it could
+        not read. If it is non-empty once the chunks are consumed, what was
+        read stays searchable but the file is recorded as incomplete, so it
+        is processed again rather than skipped as unchanged.
+        """
+        filename = os.path.basename(file_path)
+        source = os.path.abspath(file_path)
+        file_hash = self._file_hash(file_path)
+        chunker = chunker or f"{config.rag['CHUNK_SIZE']}:{config.rag['CHUNK_OVERLAP']}"
+        
+        previous = self.manifest.get_file(source)
+        if previous is not None and previous['file_hash'] == file_hash and previous['chunker'] == chunker:
+            self.logger.info(f"Skipping {filename}: unchanged since last ingest")
+            return True
+        
+        # Only an entry that is not an alias owns chunks under its document id
+        owned = previous is not None and previous['alias_of'] is None
+        if owned:
+            # Copies of the old content still rely on its chunks: hand them to
+            # one of the copies and ingest this file as a new document
+            copy = self._surviving_copy(source, file_hash)
+            if copy is not None:
+                self._promote_copy(previous, list(self.manifest.get_chunks(source)), copy, keep_document=True)
+                owned = False
+        if not owned:
+            duplicate = self.manifest.find_by_hash(file_hash, chunker)
+            if duplicate is not None:
+                return self._record_copy(file_path, file_type, file_hash, duplicate, previous)
+        
+        doc_id = previous['document_id'] if owned else str(uuid.uuid4())
+        old_chunks = self.manifest.get_chunks(source) if owned else {}
+        batch_size = config.rag['INGEST_BATCH_SIZE']
+        
+        base_metadata = dict(metadata or {})
+        base_metadata.update({
+            'filename': filename,
+            'file_type': file_type,
+            'document_id': doc_id,
+            'processed_at': datetime.utcnow().isoformat()
+        })
+        if content_type:
+            base_metadata['content_type'] = content_type
+        
+        current_chunks = []
+        occurrences = {}
+        written = []
+        preview = ''
+        batch = []
+        
+        def flush() -> bool:
+            if not batch:
+                return True
+            # Upsert only embeds chunks whose content is not already stored under that id
+            if not chromadb_service.upsert_documents_batch(batch):
+                return False
+            written.extend(chunk['id'] for chunk in batch)
+            batch.clear()
+            return True
+        
+        try:
+            for index, item in enumerate(chunks):
+                chunk, chunk_metadata = item if isinstance(item, tuple) else (item, {})
+                if len(preview) < 1000:
+                    preview += chunk[:1000 - len(preview)]
+                
+                # Chunk ids derive from content, so unchanged text keeps its id across edits
+                chunk_hash = content_hash(
+                    chunk + json.dumps(chunk_metadata, sort_keys=True) if chunk_metadata else chunk
+                )
+                occurrence = occurrences.get(chunk_hash, 0)
+                occurrences[chunk_hash] = occurrence + 1
+                chunk_id = f"{doc_id}_{chunk_hash[:16]}" + (f"_{occurrence}" if occurrence else '')
+                current_chunks.append((chunk_id, chunk_hash, index))
+                
+                if old_chunks.get(chunk_id) == index:
+                    continue
+                batch.append({
+                    'id': chunk_id,
+                    'content': chunk,
+                    'metadata': dict(base_metadata, chunk_index=index, **chunk_metadata)
+                })
+                if len(batch) >= batch_size and not flush():
+                    raise RuntimeError("Failed to store document chunks")
+            if not flush():
+                raise RuntimeError("Failed to store document chunks")
+        except Exception:
+            # Do not leave new chunks of a partial ingest behind in the vector store
+            chromadb_service.delete_documents(
+                [chunk_id for chunk_id in written + [chunk['id'] for chunk in batch] if chunk_id not in old_chunks]
+            )
+            raise
+        
+        if not current_chunks:
+            self.logger.warning(f"No text extracted from {filename}")
+            return False
+        
+        incomplete = bool(skipped)
+        current_ids = {chunk_id for chunk_id, _, _ in current_chunks}
+        stale_ids = [chunk_id for chunk_id in old_chunks if chunk_id not in current_ids]
+        if stale_ids and not chromadb_service.delete_documents(stale_ids):
+            raise RuntimeError("Failed to delete stale document chunks")
+        
+        # Save to database, updating the row of an earlier version of the file
+        document_data = {
+            'filename': filename,
+            'original_filename': filename,
+            'file_type': file_type,
+            'file_size': os.path.getsize(file_path),
+            'file_path': file_path,
+            'status': 'error' if incomplete else 'processed',
+            'processing_error': f"Could not extract {len(skipped)} part(s) of the file: {skipped[:20]}" if incomplete else None,
+            'extracted_text': preview,  # First 1000 chars
+            'content_type': content_type,
+            'chunk_count': len(current_chunks),
+            'vector_ids': [chunk_id for chunk_id, _, _ in current_chunks],
+            'processed_at': datetime.utcnow()
+        }
+        document = None
+        if previous and previous['db_document_id'] is not None:
+            document = db_manager.update_document(previous['db_document_id'], document_data)
+        if document is None:
+            document = db_manager.create_document(document_data)
+        
+        # An incomplete file never matches its real hash, so the next attempt re-reads it
+        recorded_hash = f"incomplete:{file_hash}" if incomplete else file_hash
+        self.manifest.record(source, recorded_hash, chunker, doc_id, document.id, current_chunks)
+        
+        if incomplete:
+            self.logger.warning(f"Partially processed {file_type} file: {filename} (unreadable: {skipped[:20]})")
+            return False
+        self.logger.info(
+            f"Processed {file_type} file: {filename} ({len(current_chunks)} chunks, "
+            f"{len(written)} written, {len(stale_ids)} removed)"
+        )
+        return True
+    
+    def _record_copy(self, file_path: str, file_type: str, file_hash: str,
+                     original: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> bool:
+        """Record a copy of an ingested file as an alias of the original's chunks"""
+        filename = os.path.basename(file_path)
+        chunk_ids = list(self.manifest.get_chunks(original['source']))
+        document_data = {
+            'filename': filename,
+            'original_filename': filename,
+            'file_type': file_type,
+            'file_size': os.path.getsize(file_path),
+            'file_path': file_path,
+            'status': 'processed',
+            'processing_error': None,
+            'chunk_count': len(chunk_ids),
+            'vector_ids': chunk_ids,
+            'processed_at': datetime.utcnow()
+        }
+        document = None
+        if previous and previous['db_document_id'] is not None:
+            document = db_manager.update_document(previous['db_document_id'], document_data)
+        if document is None:
+            document = db_manager.create_document(document_data)
+        
+        self.manifest.record_alias(os.path.abspath(file_path), file_hash, original, document.id)
+        self.logger.info(f"Recorded {filename} as a copy of already ingested {original['source']}")
+        return True
+    
+    @staticmethod
+    def _with_progress(pieces: Iterator[str], total: int, progress: Optional[Callable[[float], None]],
+                       weight: Callable[[str], int]) -> Iterator[str]:
+        """Pass pieces through, reporting the fraction consumed so far"""
+        done = 0
+        for piece in pieces:
+            yield piece
+            if progress is not None and total:
+                done += weight(piece)
+                progress(min(done / total, 1.0))
+    
+    def process_text_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                          progress: Callable[[float], None] = None) -> bool:
+        """Process a text file, chunking IOS configurations on their stanzas"""
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+                sample = file.read(self.READ_BLOCK_SIZE)
             
-            filename = os.path.basename(file_path)
-            doc_id = str(uuid.uuid4())
+            if looks_like_ios_config(sample):
+                return self.process_config_file(file_path, metadata, progress)
             
-            if metadata is None:
-                metadata = {}
-            
-            metadata.update({
-                'filename': filename,
-                'file_type': 'text',
-                'processed_at': datetime.utcnow().isoformat()
-            })
-            
-            # Add to ChromaDB
-            success = chromadb_service.add_document(doc_id, content, metadata)
-            
-            if success:
-                # Save to database
-                db_manager.create_document({
-                    'filename': filename,
-                    'original_filename': filename,
-                    'file_type': 'text',
-                    'file_size': len(content),
-                    'file_path': file_path,
-                    'status': 'processed',
-                    'extracted_text': content[:1000],  # First 1000 chars
-                    'chunk_count': 1,
-                    'vector_ids': doc_id
-                })
-                
-                self.logger.info(f"Processed text file: {filename}")
-                return True
+            blocks = self._with_progress(
+                self._read_text_blocks(file_path), os.path.getsize(file_path), progress,
+                lambda block: len(block.encode('utf-8'))
+            )
+            return self._ingest_chunks(file_path, 'text', iter_chunks(blocks), metadata)
             
+        except Exception as e:
+            self.logger.error(f"Error processing text file {file_path}: {e}")
             return False
+    
+    def process_config_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                            progress: Callable[[float], None] = None) -> bool:
+        """Process a device configuration, one chunk per top-level stanza"""
+        try:
+            metadata = dict(metadata or {})
+            with open(file_path, 'r', encoding='utf-8') as file:
+                lines = self._with_progress(
+                    file, os.path.getsize(file_path), progress, lambda line: len(line.encode('utf-8'))
+                )
+                chunks = iter_config_chunks(lines, device=metadata.get('device'))
+                return self._ingest_chunks(
+                    file_path, 'text', chunks, metadata,
+                    chunker=f"ios:{config.rag['CHUNK_SIZE']}", content_type='network_config'
+                )
             
         except Exception as e:
-            self.logger.error(f"Error processing text file {file_path}: {e}")
+            self.logger.error(f"Error processing config file {file_path}: {e}")
             return False
     
-    def process_pdf_file(self, file_path: str, metadata: Dict[str, Any] = None) -> bool:
+    def process_pdf_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                         progress: Callable[[float], None] = None) -> bool:
         """Process a PDF file"""
         try:
             with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                content = ""
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
-            
-            filename = os.path.basename(file_path)
-            doc_id = str(uuid.uuid4())
+                page_count = len(PyPDF2.PdfReader(file).pages)
             
-            if metadata is None:
-                metadata = {}
+            metadata = dict(metadata or {})
+            metadata['pages'] = page_count
             
-            metadata.update({
-                'filename': filename,
-                'file_type': 'pdf',
-                'pages': len(pdf_reader.pages),
-                'processed_at': datetime.utcnow().isoformat()
-            })
+            # Pages stream in order from the extractor pool as the chunker asks for them
+            failed_pages = []
+            pages = self._with_progress(
+                (text + "\n" for text in pdf_extractor.iter_pages(file_path, page_count, failed_pages)),
+                page_count, progress, lambda page: 1
+            )
+            return self._ingest_chunks(file_path, 'pdf', iter_chunks(pages), metadata, skipped=failed_pages)
             
-            # Add to ChromaDB
-            success = chromadb_service.add_document(doc_id, content, metadata)
+        except Exception as e:
+            self.logger.error(f"Error processing PDF file {file_path}: {e}")
+            return False
+    
+    def process_docx_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                          progress: Callable[[float], None] = None) -> bool:
+        """Process a Word document"""
+        try:
+            return self._ingest_chunks(file_path, 'docx', iter_chunks(iter_docx_text(file_path, progress)), metadata)
             
-            if success:
-                # Save to database
-                db_manager.create_document({
-                    'filename': filename,
-                    'original_filename': filename,
-                    'file_type': 'pdf',
-                    'file_size': os.path.getsize(file_path),
-                    'file_path': file_path,
-                    'status': 'processed',
-                    'extracted_text': content[:1000],  # First 1000 chars
-                    'chunk_count': 1,
-                    'vector_ids': doc_id
-                })
-                
-                self.logger.info(f"Processed PDF file: {filename}")
-                return True
+        except Exception as e:
+            self.logger.error(f"Error processing DOCX file {file_path}: {e}")
+            return False
+    
+    def process_spreadsheet_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                                 progress: Callable[[float], None] = None) -> bool:
+        """Process an Excel workbook, one labelled line per row"""
+        try:
+            file_type = os.path.splitext(file_path)[1].lower().lstrip('.')
+            extractor = iter_xls_rows if file_type == 'xls' else iter_xlsx_rows
+            return self._ingest_chunks(file_path, file_type, iter_chunks(extractor(file_path, progress)), metadata)
             
+        except Exception as e:
+            self.logger.error(f"Error processing spreadsheet {file_path}: {e}")
             return False
+    
+    def process_csv_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                         progress: Callable[[float], None] = None) -> bool:
+        """Process a CSV file, one labelled line per row"""
+        try:
+            return self._ingest_chunks(file_path, 'csv', iter_chunks(iter_csv_rows(file_path, progress)), metadata)
             
         except Exception as e:
-            self.logger.error(f"Error processing PDF file {file_path}: {e}")
+            self.logger.error(f"Error processing CSV file {file_path}: {e}")
             return False
     
-    def process_file(self, file_path: str, metadata: Dict[str, Any] = None) -> bool:
-        """Process any supported file type"""
+    def supports(self, file_path: str) -> bool:
+        """Check whether a file type can be processed"""
+        return os.path.splitext(file_path)[1].lower() in self.SUPPORTED_EXTENSIONS
+    
+    def process_file(self, file_path: str, metadata: Dict[str, Any] = None,
+                     progress: Callable[[float], None] = None) -> bool:
+        """Process any supported file type
+        
+        progress, if given, is called with the fraction of the file read so far.
+        """
         if not os.path.exists(file_path):
             self.logger.error(f"File not found: {file_path}")
             return False
         
+        with self._source_lock(os.path.abspath(file_path)):
+            return self._process_file(file_path, metadata, progress)
+    
+    def _process_file(self, file_path: str, metadata: Dict[str, Any],
+                      progress: Optional[Callable[[float], None]]) -> bool:
         file_ext = os.path.splitext(file_path)[1].lower()
         
         if file_ext == '.pdf':
-            return self.process_pdf_file(file_path, metadata)
-        elif file_ext in ['.txt', '.md']:
-            return self.process_text_file(file_path, metadata)
+            return self.process_pdf_file(file_path, metadata, progress)
+        elif file_ext in ['.txt', '.md', '.cfg', '.conf']:
+            return self.process_text_file(file_path, metadata, progress)
+        elif file_ext == '.docx':
+            return self.process_docx_file(file_path, metadata, progress)
+        elif file_ext in ['.xlsx', '.xls']:
+            return self.process_spreadsheet_file(file_path, metadata, progress)
+        elif file_ext == '.csv':
+            return self.process_csv_file(file_path, metadata, progress)
         else:
             self.logger.error(f"Unsupported file type: {file_ext}")
             return False
+    
+    def remove_file(self, file_path: str) -> bool:
+        """Remove the chunks, database row and manifest entry of a deleted file
+        
+        A copy only drops its own records. If the removed file has a copy
+        that still exists, the copy takes over its chunks instead.
+        """
+        source = os.path.abspath(file_path)
+        with self._source_lock(source):
+            try:
+                previous = self.manifest.get_file(source)
+                if previous is None:
+                    return True
+                
+                if previous['alias_of'] is not None:
+                    if previous['db_document_id'] is not None:
+                        db_manager.delete_document(previous['db_document_id'])
+                    self.manifest.remove(source)
+                    self.logger.info(f"Removed {os.path.basename(file_path)} (copy of {previous['alias_of']})")
+                    return True
+                
+                chunk_ids = list(self.manifest.get_chunks(source))
+                copy = self._surviving_copy(source)
+                if copy is not None:
+                    return self._promote_copy(previous, chunk_ids, copy)
+                
+                if not chromadb_service.delete_documents(chunk_ids):
+                    return False
+                if previous['db_document_id'] is not None:
+                    db_manager.delete_document(previous['db_document_id'])
+                self.manifest.remove(source)
+                
+                self.logger.info(f"Removed {os.path.basename(file_path)} ({len(chunk_ids)} chunks)")
+                return True
+                
+            except Exception as e:
+                self.logger.error(f"Error removing file {file_path}: {e}")
+                return False
+    
+    def _surviving_copy(self, source: str, content_hash: str = None) -> Optional[Dict[str, Any]]:
+        """Get an alias of source that still exists, skipping copies whose content is content_hash"""
+        for copy in self.manifest.get_aliases(source):
+            if copy['file_hash'] != content_hash and os.path.exists(copy['source']):
+                return copy
+        return None
+    
+    def _promote_copy(self, previous: Dict[str, Any], chunk_ids: List[str], copy: Dict[str, Any],
+                      keep_document: bool = False) -> bool:
+        """Hand the chunks of a removed or rewritten file over to a surviving copy
+        
+        The copy is re-ingested under the file's document id, so chunks with
+        unchanged content keep their ids and stored embeddings and only their
+        metadata is rewritten. Chunks the copy does not produce are deleted
+        afterwards. keep_document keeps the file's database row, for a file
+        that is about to be ingested again.
+        """
+        # A hash that cannot match makes the copy ingest instead of being skipped as unchanged
+        self.manifest.promote(copy['source'], f"promoted:{copy['file_hash']}")
+        if previous['db_document_id'] is not None and not keep_document:
+            db_manager.delete_document(previous['db_document_id'])
+        self.manifest.remove(previous['source'])
+        
+        with self._source_lock(copy['source']):
+            self._process_file(copy['source'], None, None)
+            kept = self.manifest.get_chunks(copy['source'])
+        
+        stale_ids = [chunk_id for chunk_id in chunk_ids if chunk_id not in kept]
+        if stale_ids and not chromadb_service.delete_documents(stale_ids):
+            self.logger.error(f"Failed to delete {len(stale_ids)} old chunks of {previous['source']}")
+            return False
+        self.logger.info(f"Copy {copy['source']} now owns {len(kept)} chunks of {previous['source']}")
+        return True
 
 
 # Global processor instance
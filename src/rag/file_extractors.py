@@ -0,0 +1,188 @@
+"""
+File Extractors
+Streaming text extraction for DOCX, spreadsheet and CSV documents
+"""
+
+import csv
+import os
+import zipfile
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+from xml.etree import ElementTree
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+Progress = Optional[Callable[[float], None]]
+
+
+class _CountingReader:
+    """File wrapper that reports the fraction of bytes read"""
+
+    def __init__(self, stream, total: int, progress: Progress):
+        self.stream = stream
+        self.total = total
+        self.progress = progress
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.consumed += len(data)
+        if self.progress is not None and self.total:
+            self.progress(min(self.consumed / self.total, 1.0))
+        return data
+
+
+def format_row(header: Optional[Sequence[Any]], values: Sequence[Any]) -> str:
+    """Render a table row as one line, labelling each value with its column header
+
+    Every line carries its own labels, so a chunk cut from the middle of a
+    large sheet still reads as "Hostname: R15; Loopback: 10.255.0.15".
+    """
+    cells = []
+    for index, value in enumerate(values):
+        if value is None or str(value).strip() == '':
+            continue
+        label = header[index] if header is not None and index < len(header) else None
+        if label is not None and str(label).strip():
+            cells.append(f"{str(label).strip()}: {str(value).strip()}")
+        else:
+            cells.append(str(value).strip())
+    return '; '.join(cells)
+
+
+def iter_docx_text(file_path: str, progress: Progress = None) -> Iterator[str]:
+    """Yield paragraphs and table rows of a DOCX file in document order
+
+    word/document.xml is parsed incrementally and each paragraph is
+    discarded once yielded, rather than loading the whole document tree.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        total = archive.getinfo('word/document.xml').file_size
+        with archive.open('word/document.xml') as stream:
+            document = _CountingReader(stream, total, progress)
+            table_depth = 0
+            paragraph_texts: List[str] = []
+            cell_paragraphs: List[str] = []
+            row_cells: List[str] = []
+
+            for event, element in ElementTree.iterparse(document, events=('start', 'end')):
+                tag = element.tag
+                if event == 'start':
+                    if tag == f'{WORD_NAMESPACE}tbl':
+                        table_depth += 1
+                    elif tag == f'{WORD_NAMESPACE}p':
+                        paragraph_texts = []
+                    continue
+
+                if tag == f'{WORD_NAMESPACE}t':
+                    paragraph_texts.append(element.text or '')
+                elif tag == f'{WORD_NAMESPACE}tab':
+                    paragraph_texts.append('\t')
+                elif tag in (f'{WORD_NAMESPACE}br', f'{WORD_NAMESPACE}cr'):
+                    paragraph_texts.append('\n')
+                elif tag == f'{WORD_NAMESPACE}p':
+                    text = ''.join(paragraph_texts)
+                    if table_depth:
+                        if text.strip():
+                            cell_paragraphs.append(text.strip())
+                    elif text.strip():
+                        yield text + '\n'
+                    element.clear()
+                elif tag == f'{WORD_NAMESPACE}tc':
+                    row_cells.append(' '.join(cell_paragraphs))
+                    cell_paragraphs = []
+                elif tag == f'{WORD_NAMESPACE}tr':
+                    row = ' | '.join(cell for cell in row_cells if cell)
+                    row_cells = []
+                    if row:
+                        yield row + '\n'
+                    element.clear()
+                elif tag == f'{WORD_NAMESPACE}tbl':
+                    table_depth -= 1
+                    yield '\n'
+                    element.clear()
+
+
+def iter_xlsx_rows(file_path: str, progress: Progress = None) -> Iterator[str]:
+    """Yield each sheet's rows as labelled lines, reading the workbook in read-only mode"""
+    import openpyxl
+
+    # Read-only mode streams rows from the sheet XML instead of building every cell
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        row_counts = [sheet.max_row for sheet in workbook.worksheets]
+        total = sum(row_counts) if None not in row_counts else None
+        rows_read = 0
+
+        for sheet in workbook.worksheets:
+            yield f"[Sheet: {sheet.title}]\n"
+            header = None
+            for values in sheet.iter_rows(values_only=True):
+                rows_read += 1
+                if progress is not None and total:
+                    progress(min(rows_read / total, 1.0))
+                if header is None:
+                    if any(value is not None and str(value).strip() for value in values):
+                        header = values
+                    continue
+                line = format_row(header, values)
+                if line:
+                    yield line + '\n'
+            yield '\n'
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(file_path: str, progress: Progress = None, chunk_rows: int = 5000) -> Iterator[str]:
+    """Yield rows of a legacy .xls workbook
+
+    openpyxl cannot read the binary format and xlrd has no streaming mode,
+    so each sheet is loaded whole; the format caps sheets at 65536 rows.
+    """
+    import pandas as pd
+
+    sheets = pd.read_excel(file_path, sheet_name=None, dtype=str)
+    total = sum(len(frame) for frame in sheets.values())
+    rows_read = 0
+    for title, frame in sheets.items():
+        yield f"[Sheet: {title}]\n"
+        header = list(frame.columns)
+        for start in range(0, len(frame), chunk_rows):
+            block = frame.iloc[start:start + chunk_rows]
+            for values in block.itertuples(index=False, name=None):
+                line = format_row(header, [None if pd.isna(value) else value for value in values])
+                if line:
+                    yield line + '\n'
+            rows_read += len(block)
+            if progress is not None and total:
+                progress(rows_read / total)
+        yield '\n'
+
+
+def iter_csv_rows(file_path: str, progress: Progress = None) -> Iterator[str]:
+    """Yield CSV rows as labelled lines, reading the file row by row"""
+    total = os.path.getsize(file_path)
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace', newline='') as file:
+        try:
+            dialect = csv.Sniffer().sniff(file.read(64 * 1024), delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        file.seek(0)
+
+        consumed = 0
+
+        def lines() -> Iterator[str]:
+            nonlocal consumed
+            for line in file:
+                consumed += len(line.encode('utf-8'))
+                yield line
+
+        header = None
+        for values in csv.reader(lines(), dialect):
+            if progress is not None and total:
+                progress(min(consumed / total, 1.0))
+            if header is None:
+                header = values
+                continue
+            line = format_row(header, values)
+            if line:
+                yield line + '\n'
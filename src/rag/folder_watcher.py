@@ -0,0 +1,259 @@
+"""
+Folder Watcher
+Incremental indexing of files added to, changed in or deleted from the documents folder
+
+Usage (from src/):
+    python -m rag.folder_watcher ../data/documents
+
+Run standalone, the watcher takes the persist directory exclusively and
+refuses to start while the web app has it open; with the app running, set
+DOCUMENTS_WATCH=true to have the app watch the folder instead.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set, Tuple
+
+from core.config import config
+from rag.document_processor import document_processor
+from rag.ingest import iter_files
+
+# (size, mtime_ns) of a file; None for a file that no longer exists
+Signature = Optional[Tuple[int, int]]
+
+
+class FolderWatcher:
+    """Polls a directory and indexes only the files that changed since the last poll
+
+    Each poll lists the tree and compares every file's size and mtime with
+    the last indexed state, so unchanged files are never opened. Files whose
+    mtime changed are handed to the document processor, whose manifest hash
+    decides whether the content really changed. A change is processed once
+    the file has looked the same for the debounce period, so a file still
+    being written, or a burst of rewrites, is indexed once. The indexed
+    state is saved, so a restart only picks up what changed while stopped.
+    """
+
+    def __init__(self, directory: str = None, interval: float = None, debounce: float = None,
+                 workers: int = None, state_path: str = None):
+        self.logger = logging.getLogger(__name__)
+        self.directory = os.path.abspath(directory or config.upload['UPLOAD_FOLDER'])
+        self.interval = interval if interval is not None else config.upload['WATCH_INTERVAL']
+        self.debounce = debounce if debounce is not None else config.upload['WATCH_DEBOUNCE']
+        self.workers = workers or config.upload['WATCH_WORKERS']
+        self.state_path = state_path or config.upload['WATCH_STATE_PATH']
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._known: Dict[str, Tuple[int, int]] = {}
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+        self._in_flight: Set[str] = set()
+        self._dirty = False
+        self._stats = {'polls': 0, 'indexed': 0, 'removed': 0, 'failed': 0,
+                       'last_poll_at': None, 'last_poll_ms': None}
+        self._load_state()
+
+    def _load_state(self):
+        """Load the signatures indexed by a previous run over the same directory"""
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get('directory') == self.directory:
+                self._known = {path: tuple(signature) for path, signature in state['files'].items()}
+                self.logger.info(f"Loaded watcher state for {len(self._known)} files")
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable watcher state {self.state_path}: {e}")
+
+    def _save_state(self):
+        """Write the indexed signatures atomically"""
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {'directory': self.directory, 'files': dict(self._known)}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            temp_path = f"{self.state_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            self.logger.error(f"Failed to save watcher state: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Stat every supported file under the directory"""
+        current = {}
+        for path in iter_files(self.directory, document_processor.supports):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            current[path] = (stat.st_size, stat.st_mtime_ns)
+        return current
+
+    def poll(self) -> int:
+        """Compare the directory with the indexed state and queue settled changes
+
+        Returns the number of files queued for indexing or removal.
+        """
+        started = time.perf_counter()
+        current = self._scan()
+        now = time.monotonic()
+        queued = 0
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='folder-watch')
+            for path in set(current) | set(self._known):
+                signature = current.get(path)
+                if path in self._in_flight:
+                    # Re-examined after the running job records what it indexed
+                    continue
+                if self._known.get(path) == signature:
+                    self._pending.pop(path, None)
+                    continue
+
+                seen = self._pending.get(path)
+                if seen is None or seen[0] != signature:
+                    seen = self._pending[path] = (signature, now)
+                if now - seen[1] >= self.debounce:
+                    del self._pending[path]
+                    self._in_flight.add(path)
+                    self._executor.submit(self._apply, path, signature)
+                    queued += 1
+
+            # Files that appeared and vanished again before settling
+            for path in [path for path in self._pending if path not in current and path not in self._known]:
+                del self._pending[path]
+
+            self._stats['polls'] += 1
+            self._stats['last_poll_at'] = time.time()
+            self._stats['last_poll_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+        if queued:
+            self.logger.info(f"Queued {queued} changed files from {self.directory}")
+        self._save_state()
+        return queued
+
+    def _apply(self, path: str, signature: Signature):
+        """Index or remove one file and record the result"""
+        try:
+            if signature is None:
+                success = document_processor.remove_file(path)
+            else:
+                success = document_processor.process_file(path)
+        except Exception as e:
+            self.logger.error(f"Watcher failed on {path}: {e}")
+            success = False
+
+        with self._lock:
+            self._in_flight.discard(path)
+            if signature is None:
+                if success:
+                    self._known.pop(path, None)
+                    self._stats['removed'] += 1
+                else:
+                    # Removal is retried on the next poll
+                    self._stats['failed'] += 1
+            else:
+                # A file that fails to process is not retried until it changes again
+                self._known[path] = signature
+                self._stats['indexed' if success else 'failed'] += 1
+            self._dirty = True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error(f"Folder watcher poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> bool:
+        """Start polling in a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='folder-watcher', daemon=True)
+        self._thread.start()
+        self.logger.info(
+            f"Watching {self.directory} every {self.interval}s "
+            f"(debounce {self.debounce}s, {self.workers} workers)"
+        )
+        return True
+
+    def stop(self, wait: bool = True):
+        """Stop polling, optionally waiting for queued files to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+        self._save_state()
+
+    def status(self) -> Dict[str, Any]:
+        """Get watcher state and counters"""
+        with self._lock:
+            return dict(
+                self._stats,
+                running=self._thread is not None and self._thread.is_alive(),
+                directory=self.directory,
+                interval=self.interval,
+                debounce=self.debounce,
+                workers=self.workers,
+                tracked_files=len(self._known),
+                pending=len(self._pending),
+                in_flight=len(self._in_flight)
+            )
+
+
+# Global watcher over the documents folder
+folder_watcher = FolderWatcher()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Watch a directory and keep the RAG index in sync with it")
+    parser.add_argument('directory', nargs='?', default=None, help="directory to watch (default: UPLOAD_FOLDER)")
+    parser.add_argument('--interval', type=float, default=None, help="seconds between polls")
+    parser.add_argument('--debounce', type=float, default=None, help="seconds a file must be unchanged")
+    parser.add_argument('--workers', type=int, default=None, help="files processed concurrently")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    from core.chromadb_service import DirectoryInUseError, open_exclusive
+    try:
+        open_exclusive()
+    except DirectoryInUseError as e:
+        sys.exit(f"{e}. Stop the web app first, or have it watch the folder itself with DOCUMENTS_WATCH=true.")
+
+    watcher = folder_watcher
+    if args.directory or args.interval is not None or args.debounce is not None or args.workers:
+        watcher = FolderWatcher(args.directory, args.interval, args.debounce, args.workers)
+
+    watcher.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Bulk Ingest
+Index a directory tree of documents with parallel workers and a resumable checkpoint
+
+Usage (from src/):
+    python -m rag.ingest ../data/documents --workers 4
+
+The CLI writes to the vector store directly, so it takes the persist
+directory exclusively and refuses to run while the web app has it open.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, Set, Tuple
+
+from core.config import config
+
+logger = logging.getLogger(__name__)
+
+
+def iter_files(root: str, supports) -> Iterator[str]:
+    """Walk a directory tree in a stable order, yielding supported files"""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith('.'))
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            if not filename.startswith('.') and supports(path):
+                yield path
+
+
+def file_signature(path: str) -> str:
+    """Identify a file version cheaply by size and modification time"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class IngestCheckpoint:
+    """Append-only record of files finished in a run, so an interrupted run can resume"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Set[Tuple[str, str]] = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        # Failed files are retried on resume
+                        if entry['success']:
+                            self.done.add((entry['path'], entry['signature']))
+                    except (ValueError, KeyError):
+                        # A torn last line from a crash is ignored
+                        continue
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a')
+
+    def is_done(self, path: str, signature: str) -> bool:
+        return (path, signature) in self.done
+
+    def mark_done(self, path: str, signature: str, success: bool):
+        with self._lock:
+            self._file.write(json.dumps({'path': path, 'signature': signature, 'success': success}) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self, remove: bool = False):
+        self._file.close()
+        if remove:
+            os.remove(self.path)
+
+
+def default_checkpoint_path(root: str) -> str:
+    """Checkpoint location for a directory, kept next to the other data stores"""
+    key = hashlib.sha256(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(os.path.dirname(config.rag['INGEST_MANIFEST_PATH']), 'ingest_checkpoints', f"{key}.jsonl")
+
+
+def ingest_directory(root: str, workers: int = 4, checkpoint_path: str = None,
+                     restart: bool = False) -> Dict[str, Any]:
+    """Process every supported file under root and return a throughput summary"""
+    from core.chromadb_service import chromadb_service
+    from rag.document_processor import document_processor
+
+    root = os.path.abspath(root)
+    checkpoint_path = checkpoint_path or default_checkpoint_path(root)
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    if checkpoint.done:
+        logger.info(f"Resuming from checkpoint {checkpoint_path} ({len(checkpoint.done)} files done)")
+
+    summary = {'files': 0, 'processed': 0, 'failed': 0, 'resumed': 0, 'bytes': 0}
+    failures = []
+    documents_before = chromadb_service.collection.count()
+    started = time.perf_counter()
+
+    def process(path: str, signature: str) -> Tuple[str, str, bool]:
+        return path, signature, document_processor.process_file(path)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-ingest')
+    interrupted = False
+    try:
+        futures = []
+        for path in iter_files(root, document_processor.supports):
+            summary['files'] += 1
+            signature = file_signature(path)
+            if checkpoint.is_done(path, signature):
+                summary['resumed'] += 1
+                continue
+            summary['bytes'] += os.path.getsize(path)
+            futures.append(executor.submit(process, path, signature))
+
+        for completed, future in enumerate(as_completed(futures), start=1):
+            path, signature, success = future.result()
+            checkpoint.mark_done(path, signature, success)
+            if success:
+                summary['processed'] += 1
+            else:
+                summary['failed'] += 1
+                failures.append(path)
+            if completed % 100 == 0 or completed == len(futures):
+                logger.info(f"Ingested {completed}/{len(futures)} files ({summary['failed']} failed)")
+    except KeyboardInterrupt:
+        interrupted = True
+        logger.warning(f"Interrupted; rerun to resume from {checkpoint_path}")
+        executor.shutdown(wait=True, cancel_futures=True)
+    finally:
+        executor.shutdown(wait=True)
+        # A finished run leaves nothing to resume; the ingest manifest skips unchanged files next time
+        checkpoint.close(remove=not interrupted and not failures)
+
+    elapsed = time.perf_counter() - started
+    chunks_added = chromadb_service.collection.count() - documents_before
+    summary.update({
+        'interrupted': interrupted,
+        'chunks_added': chunks_added,
+        'seconds': round(elapsed, 2),
+        'files_per_second': round(summary['processed'] / elapsed, 2) if elapsed > 0 else None,
+        'chunks_per_second': round(chunks_added / elapsed, 1) if elapsed > 0 else None,
+        'mb_per_second': round(summary['bytes'] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
+        'failures': failures
+    })
+    return summary
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of documents into the RAG index")
+    parser.add_argument('directory')
+    parser.add_argument('--workers', type=int, default=4, help="files processed concurrently")
+    parser.add_argument('--batch-size', type=int, default=None, help="chunks per embedding/write batch")
+    parser.add_argument('--checkpoint', default=None, help="checkpoint file (default: per-directory under data/)")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+    if args.batch_size:
+        config.rag['INGEST_BATCH_SIZE'] = args.batch_size
+
+    from core.chromadb_service import DirectoryInUseError, open_exclusive
+    try:
+        open_exclusive()
+    except DirectoryInUseError as e:
+        sys.exit(f"{e}. Stop the web app first, or add the files through it "
+                 f"(upload them, or let its folder watcher index them with DOCUMENTS_WATCH=true).")
+
+    summary = ingest_directory(args.directory, args.workers, args.checkpoint, args.restart)
+
+    print(f"Files:       {summary['files']} found, {summary['processed']} processed, "
+          f"{summary['failed']} failed, {summary['resumed']} skipped from checkpoint")
+    print(f"Chunks:      {summary['chunks_added']} added")
+    print(f"Elapsed:     {summary['seconds']}s")
+    print(f"Throughput:  {summary['files_per_second']} files/s, {summary['chunks_per_second']} chunks/s, "
+          f"{summary['mb_per_second']} MB/s")
+    for path in summary['failures']:
+        print(f"Failed:      {path}")
+    sys.exit(1 if summary['failed'] or summary['interrupted'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Ingest Jobs
+Background processing of uploaded documents with pollable job status
+"""
+
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from core.cache import LRUCache
+from core.config import config
+from rag.document_processor import document_processor
+
+
+class IngestJobQueue:
+    """Runs document processing on a worker pool and tracks each upload as a job
+
+    Job status follows Document.status: uploaded (queued), processing,
+    processed or error. Finished jobs are kept for lookup in a bounded LRU.
+    """
+
+    def __init__(self, workers: int = None, max_jobs: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers or config.upload['INGEST_WORKERS']
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+        self._jobs = LRUCache(max_jobs or config.upload['INGEST_JOB_HISTORY'])
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str, filename: str = None, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Queue a saved file for processing and return its job"""
+        job = {
+            'job_id': str(uuid.uuid4()),
+            'filename': filename or file_path,
+            'file_path': file_path,
+            'status': 'uploaded',
+            'progress': 0.0,
+            'error': None,
+            'created_at': datetime.utcnow().isoformat(),
+            'started_at': None,
+            'finished_at': None
+        }
+        self._jobs.set(job['job_id'], job)
+        self._executor.submit(self._run, job, metadata)
+        self.logger.info(f"Queued ingest job {job['job_id']} for {job['filename']}")
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of a job"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            return dict(job)
+
+    def _update(self, job: Dict[str, Any], **changes):
+        with self._lock:
+            job.update(changes)
+
+    def _run(self, job: Dict[str, Any], metadata: Optional[Dict[str, Any]]):
+        self._update(job, status='processing', started_at=datetime.utcnow().isoformat())
+
+        def report(fraction: float):
+            # Reading is interleaved with embedding, so it tracks overall progress;
+            # 100 is only reported once the document is stored
+            self._update(job, progress=round(min(fraction, 0.99) * 100, 1))
+
+        try:
+            success = document_processor.process_file(job['file_path'], metadata, progress=report)
+            if success:
+                self._update(job, status='processed', progress=100.0)
+            else:
+                self._update(job, status='error', error='Failed to process document')
+        except Exception as e:
+            self.logger.error(f"Ingest job {job['job_id']} failed: {e}")
+            self._update(job, status='error', error=str(e))
+        finally:
+            self._update(job, finished_at=datetime.utcnow().isoformat())
+            self.logger.info(f"Ingest job {job['job_id']} finished: {job['status']}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            'workers': self.workers,
+            'jobs': self._jobs.stats()
+        }
+
+
+# Global ingest job queue
+ingest_jobs = IngestJobQueue()
@@ -0,0 +1,153 @@
+"""
+Ingest Manifest
+Persistent record of ingested files and their chunk hashes for deduplicated re-ingestion
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IngestManifest:
+    """SQLite-backed manifest keyed by source path, file hash and per-chunk hash
+
+    A copy of a file that is already ingested is recorded as an alias: a
+    files entry whose alias_of names the source that owns the chunks.
+    """
+
+    def __init__(self, path: str):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._initialize_database()
+
+    def _initialize_database(self):
+        """Open the manifest database and create the schema"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS files (
+                source TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                chunker TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                db_document_id INTEGER,
+                chunk_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                alias_of TEXT
+            )"""
+        )
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(files)")}
+        if 'alias_of' not in columns:
+            self._conn.execute("ALTER TABLE files ADD COLUMN alias_of TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_alias ON files (alias_of)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_hash ON files (file_hash, chunker)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                source TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                PRIMARY KEY (source, chunk_id)
+            )"""
+        )
+        self._conn.commit()
+        self.logger.info(f"Ingest manifest opened: {self.path}")
+
+    def get_file(self, source: str) -> Optional[Dict[str, Any]]:
+        """Get the manifest entry for a source path"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM files WHERE source = ?", (source,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, file_hash: str, chunker: str) -> Optional[Dict[str, Any]]:
+        """Get the entry owning the chunks of identical file content chunked the same way"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM files WHERE file_hash = ? AND chunker = ? AND alias_of IS NULL LIMIT 1",
+                (file_hash, chunker)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_chunks(self, source: str) -> Dict[str, int]:
+        """Map each stored chunk id of a source to its chunk index"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, chunk_index FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+        return {row['chunk_id']: row['chunk_index'] for row in rows}
+
+    def record(self, source: str, file_hash: str, chunker: str, document_id: str,
+               db_document_id: Optional[int], chunks: List[Tuple[str, str, int]]):
+        """Replace the entry for a source with its current (chunk_id, chunk_hash, chunk_index) list"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.executemany(
+                    "INSERT INTO chunks (source, chunk_id, chunk_hash, chunk_index) VALUES (?, ?, ?, ?)",
+                    [(source, chunk_id, chunk_hash, index) for chunk_id, chunk_hash, index in chunks]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files "
+                    "(source, file_hash, chunker, document_id, db_document_id, chunk_count, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (source, file_hash, chunker, document_id, db_document_id, len(chunks), time.time())
+                )
+
+    def record_alias(self, source: str, file_hash: str, owner: Dict[str, Any], db_document_id: Optional[int]):
+        """Record a source whose content is stored under the chunks of owner"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files "
+                    "(source, file_hash, chunker, document_id, db_document_id, chunk_count, updated_at, alias_of) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, file_hash, owner['chunker'], owner['document_id'], db_document_id,
+                     owner['chunk_count'], time.time(), owner['source'])
+                )
+
+    def get_aliases(self, source: str) -> List[Dict[str, Any]]:
+        """Get the entries recorded as aliases of a source"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM files WHERE alias_of = ? ORDER BY updated_at", (source,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def promote(self, source: str, file_hash: str):
+        """Make an alias the owner of its content in place of the source it aliased"""
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute("SELECT alias_of FROM files WHERE source = ?", (source,)).fetchone()
+                if row is None or row['alias_of'] is None:
+                    return
+                self._conn.execute(
+                    "UPDATE files SET alias_of = NULL, file_hash = ?, updated_at = ? WHERE source = ?",
+                    (file_hash, time.time(), source)
+                )
+                self._conn.execute(
+                    "UPDATE files SET alias_of = ? WHERE alias_of = ?", (source, row['alias_of'])
+                )
+
+    def remove(self, source: str):
+        """Forget a source"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.execute("DELETE FROM files WHERE source = ?", (source,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get manifest statistics"""
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            aliases = self._conn.execute("SELECT COUNT(*) FROM files WHERE alias_of IS NOT NULL").fetchone()[0]
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        return {'path': self.path, 'files': files, 'aliases': aliases, 'chunks': chunks}
@@ -0,0 +1,143 @@
+"""
+PDF Extractor
+Page-parallel PDF text extraction streamed in page order
+"""
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
+
+from core.config import config
+
+# Reader kept open per worker process so consecutive pages reuse the parsed file.
+# It is keyed on the file version, so a file rewritten at the same path is parsed again.
+_worker_reader = None
+_worker_key = None
+
+
+def _extract_page(file_path: str, version: Tuple[int, int], page_num: int) -> str:
+    """Extract the text of one page in a worker process"""
+    global _worker_reader, _worker_key
+    import PyPDF2
+
+    if _worker_key != (file_path, version):
+        _worker_reader = PyPDF2.PdfReader(file_path)
+        _worker_key = (file_path, version)
+    return _worker_reader.pages[page_num].extract_text() or ''
+
+
+class PdfPageExtractor:
+    """Extracts PDF pages across a process pool, yielding them in page order
+
+    Each file gets its own pool, so its workers (and the parsed PDF they
+    hold) go away when the file is done, and a stuck page only ever kills
+    that file's workers. At most a few pages per worker are in flight, so
+    memory does not grow with the size of the PDF. A page that fails or
+    exceeds the per-page timeout is yielded as empty text and reported to
+    the caller through failed_pages.
+    """
+
+    # Times a pool whose worker died is replaced before remaining pages fail
+    MAX_POOL_RESTARTS = 1
+
+    def __init__(self, workers: int = None, page_timeout: float = None, min_pages: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.workers = config.rag['PDF_WORKERS'] if workers is None else workers
+        self.page_timeout = page_timeout or config.rag['PDF_PAGE_TIMEOUT']
+        self.min_pages = min_pages or config.rag['PDF_PARALLEL_MIN_PAGES']
+        self.pages_timed_out = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Spawned workers avoid inheriting the web server's threads and handles
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    @staticmethod
+    def _close_executor(executor: ProcessPoolExecutor, terminate: bool):
+        """Shut a pool down, killing workers that may be stuck on a page"""
+        if terminate:
+            for process in list((getattr(executor, '_processes', None) or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=not terminate, cancel_futures=True)
+
+    def iter_pages(self, file_path: str, page_count: int,
+                   failed_pages: Optional[List[int]] = None) -> Iterator[str]:
+        """Yield the text of each page in order
+
+        Numbers (1-based) of pages that could not be extracted are appended
+        to failed_pages, so the caller can avoid treating the file as complete.
+        """
+        if self.workers <= 1 or page_count < self.min_pages:
+            yield from self._iter_pages_inline(file_path, page_count, failed_pages)
+            return
+
+        stat = os.stat(file_path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        executor = self._new_executor()
+        restarts = 0
+        window = self.workers * 2
+        pending = deque()
+        next_page = 0
+        timed_out = False
+        try:
+            while next_page < page_count or pending:
+                while next_page < page_count and len(pending) < window:
+                    pending.append((next_page, executor.submit(_extract_page, file_path, version, next_page)))
+                    next_page += 1
+
+                page_num, future = pending[0]
+                try:
+                    text = future.result(timeout=self.page_timeout)
+                except BrokenProcessPool:
+                    if restarts < self.MAX_POOL_RESTARTS:
+                        # A worker died (crash or OOM); resubmit every unfinished page on a fresh pool
+                        restarts += 1
+                        self.logger.warning(f"PDF worker pool broke on {file_path}; restarting it")
+                        self._close_executor(executor, terminate=True)
+                        executor = self._new_executor()
+                        pending = deque(
+                            (num, executor.submit(_extract_page, file_path, version, num)) for num, _ in pending
+                        )
+                        continue
+                    text = self._page_failed(file_path, page_num, "worker pool broke", failed_pages)
+                except FutureTimeoutError:
+                    timed_out = True
+                    self.pages_timed_out += 1
+                    text = self._page_failed(
+                        file_path, page_num, f"extraction exceeded {self.page_timeout}s", failed_pages
+                    )
+                except Exception as e:
+                    text = self._page_failed(file_path, page_num, str(e), failed_pages)
+                pending.popleft()
+                yield text
+        finally:
+            self._close_executor(executor, terminate=timed_out or bool(pending))
+
+    def _page_failed(self, file_path: str, page_num: int, reason: str,
+                     failed_pages: Optional[List[int]]) -> str:
+        self.logger.warning(f"Skipping page {page_num + 1} of {file_path}: {reason}")
+        if failed_pages is not None:
+            failed_pages.append(page_num + 1)
+        return ''
+
+    def _iter_pages_inline(self, file_path: str, page_count: int,
+                           failed_pages: Optional[List[int]]) -> Iterator[str]:
+        """Extract pages in this process, for small files or when the pool is disabled"""
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(file_path)
+        for page_num in range(page_count):
+            try:
+                yield reader.pages[page_num].extract_text() or ''
+            except Exception as e:
+                yield self._page_failed(file_path, page_num, str(e), failed_pages)
+
+
+# Global PDF extractor instance
+pdf_extractor = PdfPageExtractor()
@@ -0,0 +1,146 @@
+"""
+Reranker
+Optional cross-encoder rescoring of retrieved chunks under a per-request time budget
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+from core.cache import LRUCache
+from core.config import config
+from core.embedding_cache import content_hash
+
+
+class CrossEncoderReranker:
+    """Rescores (query, chunk) pairs with a small CPU cross-encoder
+
+    The model loads in a background thread on first use and is timed on a
+    warmup batch before it serves, so the per-pair cost is known up front.
+    Scoring runs on a dedicated thread and each request waits for it only
+    until its time budget runs out; a request that cannot be fully scored
+    in time keeps the vector order, and the late batch still fills the
+    score cache.
+    """
+
+    def __init__(self, model_name: str = None, time_budget_ms: int = None,
+                 batch_size: int = 8, cache_size: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name or config.rag['RERANK_MODEL']
+        self.time_budget_ms = time_budget_ms or config.rag['RERANK_TIME_BUDGET_MS']
+        self.batch_size = batch_size
+        self.score_cache = LRUCache(cache_size or config.rag['RERANK_CACHE_SIZE'])
+        self.reranked = 0
+        self.fallbacks = 0
+        self._model = None
+        self._load_error: Optional[str] = None
+        self._loader: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._seconds_per_pair: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reranker')
+
+    def _load_model(self):
+        try:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(self.model_name, device='cpu')
+            
+            # The first predict pays one-off setup costs; time a full batch after it
+            warmup = [('warmup query', 'warmup passage ' * 32)] * self.batch_size
+            model.predict(warmup[:1], show_progress_bar=False)
+            started = time.perf_counter()
+            model.predict(warmup, show_progress_bar=False)
+            self._seconds_per_pair = (time.perf_counter() - started) / len(warmup)
+            
+            self._model = model
+            self.logger.info(
+                f"Loaded rerank model: {self.model_name} "
+                f"({self._seconds_per_pair * 1000:.1f} ms per pair)"
+            )
+        except Exception as e:
+            self._load_error = str(e)
+            self.logger.error(f"Failed to load rerank model {self.model_name}: {e}")
+
+    def _get_model(self):
+        """Get the model, starting a background load if it is not ready yet"""
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._loader is None and self._load_error is None:
+                self._loader = threading.Thread(target=self._load_model, name="reranker-loader", daemon=True)
+                self._loader.start()
+        return None
+
+    def _fallback(self, results: List[Dict[str, Any]], top_k: int, reason: str) -> List[Dict[str, Any]]:
+        self.fallbacks += 1
+        self.logger.info(f"Rerank skipped ({reason}), keeping vector order")
+        return [dict(result, reranked=False) for result in results[:top_k]]
+
+    def _score_batch(self, model, query: str, contents: List[str], keys: List[Any]) -> List[float]:
+        """Score one batch on the scoring thread, caching the scores"""
+        started = time.perf_counter()
+        scores = [float(score) for score in model.predict(
+            [(query, content) for content in contents], show_progress_bar=False
+        )]
+        self._seconds_per_pair = (time.perf_counter() - started) / len(contents)
+        for key, score in zip(keys, scores):
+            self.score_cache.set(key, score)
+        return scores
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_k: int,
+               time_budget_ms: int = None) -> List[Dict[str, Any]]:
+        """Get the top_k results by cross-encoder score, or the first top_k if over budget"""
+        if not results:
+            return []
+
+        deadline = time.perf_counter() + (time_budget_ms or self.time_budget_ms) / 1000.0
+        keys = [(query, content_hash(result.get('content') or '')) for result in results]
+        scores = {key: self.score_cache.get(key) for key in keys}
+        pending = [i for i, key in enumerate(keys) if scores[key] is None]
+
+        if pending:
+            model = self._get_model()
+            if model is None:
+                return self._fallback(results, top_k, self._load_error or "model loading")
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                remaining = deadline - time.perf_counter()
+                # Do not start a batch that is expected to overrun the budget
+                if self._seconds_per_pair is not None and self._seconds_per_pair * len(batch) > remaining:
+                    return self._fallback(results, top_k, "time budget")
+
+                future = self._executor.submit(
+                    self._score_batch, model, query,
+                    [results[i].get('content') or '' for i in batch], [keys[i] for i in batch]
+                )
+                try:
+                    batch_scores = future.result(timeout=max(deadline - time.perf_counter(), 0))
+                except FutureTimeoutError:
+                    # Still queued behind other requests: drop it; already running: let it fill the cache
+                    future.cancel()
+                    return self._fallback(results, top_k, "time budget")
+
+                for i, score in zip(batch, batch_scores):
+                    scores[keys[i]] = score
+
+        self.reranked += 1
+        ranked = sorted(range(len(results)), key=lambda i: scores[keys[i]], reverse=True)
+        return [dict(results[i], rerank_score=scores[keys[i]], reranked=True) for i in ranked[:top_k]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get reranker statistics"""
+        return {
+            'model': self.model_name,
+            'loaded': self._model is not None,
+            'load_error': self._load_error,
+            'time_budget_ms': self.time_budget_ms,
+            'reranked': self.reranked,
+            'fallbacks': self.fallbacks,
+            'score_cache': self.score_cache.stats()
+        }
+
+
+# Global reranker instance
+reranker = CrossEncoderReranker()
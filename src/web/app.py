@@ -3,11 +3,13 @@ Main Flask Application
 Network Automation AI Agent Web Interface
 """
 
+import json
 import logging
 import os
 import sys
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
 from datetime import datetime
 import uuid
 
@@ -17,8 +19,18 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from core.config import config
 from core.database import db_manager
 from core.ollama_service import ollama_service
-from core.chromadb_service import chromadb_service
+from core.chromadb_service import ChromaDBService, chromadb_service, get_chromadb_service
+from core.collection_snapshot import export_snapshot, import_snapshot, MANIFEST_NAME
+from core.service_registry import registry
 from rag.document_processor import document_processor
+from rag.context_builder import context_builder
+from rag.reranker import reranker
+from rag.folder_watcher import folder_watcher
+from rag.ingest_jobs import ingest_jobs
+
+# The app is the long-running process, so it alone migrates a collection
+# embedded with another model; command line tools leave it to the app
+registry.register('chromadb', lambda: ChromaDBService(auto_migrate=config.chromadb['AUTO_MIGRATE']))
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -158,19 +170,37 @@ def settings():
 # API Routes
 @app.route('/api/health')
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness only, never waits for service warmup)"""
     try:
-        db_health = db_manager.health_check()
+        if registry.is_ready('database'):
+            db_health = db_manager.health_check()
+            database_status = 'connected' if db_health else 'disconnected'
+        else:
+            db_health = True
+            database_status = 'initializing'
+        
         return jsonify({
             'status': 'healthy' if db_health else 'unhealthy',
             'timestamp': datetime.utcnow().isoformat(),
-            'database': 'connected' if db_health else 'disconnected'
+            'database': database_status
         })
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/api/ready')
+def readiness_check():
+    """Readiness endpoint reporting which services are warm"""
+    services = registry.status()
+    ready = all(service['state'] == 'ready' for service in services.values())
+    return jsonify({
+        'ready': ready,
+        'services': services,
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200 if ready else 503
+
+
 @app.route('/api/stats')
 def get_stats():
     """Get application statistics"""
@@ -251,6 +281,83 @@ def api_delete_device(device_id):
         return jsonify({'error': str(e)}), 500
 
 
+CHAT_SYSTEM_PROMPT = "You are a helpful network automation AI assistant. Help users with network configuration, troubleshooting, and automation tasks. Be concise but informative."
+
+
+def _chat_messages(content):
+    """Build the model messages for a chat turn"""
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+        {"role": "user", "content": content}
+    ]
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _sse_response(events):
+    """Stream events to the client without proxy buffering"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _relay_stream(stream, session_id=None):
+    """Relay model stream events as SSE, saving the reply to the chat history when it ends
+    
+    If the client disconnects mid-stream, the text generated so far is saved.
+    """
+    parts = []
+    saved = False
+    
+    def save(content):
+        nonlocal saved
+        saved = True
+        if session_id is None:
+            return None
+        try:
+            message = db_manager.create_chat_message({
+                'session_id': session_id,
+                'message_type': 'assistant',
+                'content': content,
+                'agent_name': 'NetworkAgent',
+                'agent_role': 'Network Assistant'
+            })
+            return message.id if message else None
+        except Exception as e:
+            logger.error(f"Error saving streamed chat message: {e}")
+            return None
+    
+    try:
+        for event in stream:
+            if event['type'] == 'token':
+                parts.append(event['content'])
+                yield _sse('token', {'content': event['content']})
+            elif event['type'] == 'done':
+                message_id = save(event['response'])
+                logger.info(f"Streamed {event['completion_tokens']} tokens, first after {event['time_to_first_token_ms']}ms")
+                yield _sse('done', {
+                    'session_id': session_id,
+                    'message_id': message_id,
+                    'model': event['model'],
+                    'prompt_tokens': event['prompt_tokens'],
+                    'completion_tokens': event['completion_tokens'],
+                    'time_to_first_token_ms': event['time_to_first_token_ms']
+                })
+            else:
+                content = ''.join(parts) or f"I'm sorry, I'm having trouble processing your request right now. Error: {event['error']}"
+                message_id = save(content)
+                yield _sse('error', {'error': event['error'], 'message_id': message_id})
+    finally:
+        stream.close()
+        if not saved and parts:
+            save(''.join(parts))
+
+
 @app.route('/api/chat/message', methods=['POST'])
 def api_chat_message():
     """Send chat message"""
@@ -269,12 +376,7 @@ def api_chat_message():
         })
         
         # Process message with AI agent
-        messages = [
-            {"role": "system", "content": "You are a helpful network automation AI assistant. Help users with network configuration, troubleshooting, and automation tasks. Be concise but informative."},
-            {"role": "user", "content": data['content']}
-        ]
-        
-        ai_result = ollama_service.chat_completion(messages, temperature=0.7, max_tokens=500)
+        ai_result = ollama_service.chat_completion(_chat_messages(data['content']), temperature=0.7, max_tokens=500)
         
         if ai_result['success']:
             response_content = ai_result['response']
@@ -301,6 +403,36 @@ def api_chat_message():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def api_chat_stream():
+    """Send chat message and stream the reply as Server-Sent Events"""
+    try:
+        data = request.get_json()
+        if not data or 'content' not in data:
+            return jsonify({'error': 'Message content required'}), 400
+        
+        session_id = data.get('session_id', session.get('session_id', str(uuid.uuid4())))
+        
+        # Save user message
+        db_manager.create_chat_message({
+            'session_id': session_id,
+            'message_type': 'user',
+            'content': data['content']
+        })
+        
+        stream = ollama_service.stream_chat_completion(_chat_messages(data['content']), temperature=0.7, max_tokens=500)
+        
+        def events():
+            yield _sse('start', {'session_id': session_id})
+            yield from _relay_stream(stream, session_id)
+        
+        return _sse_response(events())
+        
+    except Exception as e:
+        logger.error(f"Error streaming chat message: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/chat/history/<session_id>')
 def api_chat_history(session_id):
     """Get chat history for session"""
@@ -378,6 +510,16 @@ def api_ollama_models():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/ollama/cache')
+def api_ollama_cache():
+    """Get LLM response cache statistics"""
+    try:
+        return jsonify(ollama_service.cache_stats())
+    except Exception as e:
+        logger.error(f"Error getting response cache stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/ai/analyze-config', methods=['POST'])
 def api_analyze_config():
     """Analyze network configuration using AI"""
@@ -390,7 +532,7 @@ def api_analyze_config():
         device_name = data.get('device_name', 'Unknown')
         
         # Analyze with Ollama
-        result = ollama_service.analyze_network_config(config_text)
+        result = ollama_service.analyze_network_config(config_text, bypass_cache=data.get('bypass_cache', False))
         
         if result['success']:
             # Save analysis result to database (optional)
@@ -409,6 +551,7 @@ def api_analyze_config():
                 'analysis': result['response'],
                 'model': result['model'],
                 'tokens_used': result.get('completion_tokens', 0),
+                'cached': result.get('cached', False),
                 'device_name': device_name
             })
         else:
@@ -434,7 +577,9 @@ def api_generate_commands():
         device_type = data.get('device_type', 'cisco_ios')
         
         # Generate commands with Ollama
-        result = ollama_service.generate_network_command(task_description, device_type)
+        result = ollama_service.generate_network_command(
+            task_description, device_type, bypass_cache=data.get('bypass_cache', False)
+        )
         
         if result['success']:
             return jsonify({
@@ -443,7 +588,8 @@ def api_generate_commands():
                 'model': result['model'],
                 'task_description': task_description,
                 'device_type': device_type,
-                'tokens_used': result.get('completion_tokens', 0)
+                'tokens_used': result.get('completion_tokens', 0),
+                'cached': result.get('cached', False)
             })
         else:
             return jsonify({
@@ -468,7 +614,9 @@ def api_troubleshoot():
         device_logs = data.get('device_logs', '')
         
         # Get troubleshooting guidance with Ollama
-        result = ollama_service.troubleshoot_network_issue(issue_description, device_logs)
+        result = ollama_service.troubleshoot_network_issue(
+            issue_description, device_logs, bypass_cache=data.get('bypass_cache', False)
+        )
         
         if result['success']:
             return jsonify({
@@ -476,7 +624,8 @@ def api_troubleshoot():
                 'guidance': result['response'],
                 'model': result['model'],
                 'issue_description': issue_description,
-                'tokens_used': result.get('completion_tokens', 0)
+                'tokens_used': result.get('completion_tokens', 0),
+                'cached': result.get('cached', False)
             })
         else:
             return jsonify({
@@ -502,6 +651,53 @@ def api_chromadb_health():
         return jsonify({'error': str(e)}), 500
 
 
+def _snapshot_directory(name: str) -> str:
+    """Resolve a snapshot name to its directory under SNAPSHOT_DIRECTORY"""
+    return os.path.join(config.chromadb['SNAPSHOT_DIRECTORY'], secure_filename(name))
+
+
+@app.route('/api/chromadb/snapshot/export', methods=['POST'])
+def api_chromadb_snapshot_export():
+    """Export the active collection, embeddings included, through the running service"""
+    try:
+        data = request.get_json(silent=True) or {}
+        name = secure_filename(data.get('name') or datetime.utcnow().strftime('snapshot-%Y%m%d-%H%M%S'))
+        if not name:
+            return jsonify({'error': 'Invalid snapshot name'}), 400
+        
+        result = export_snapshot(
+            get_chromadb_service(), _snapshot_directory(name),
+            page_size=data.get('page_size'), compress=data.get('compress', True)
+        )
+        return jsonify(dict(result, success=True, name=name))
+        
+    except Exception as e:
+        logger.error(f"Error exporting collection snapshot: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/chromadb/snapshot/import', methods=['POST'])
+def api_chromadb_snapshot_import():
+    """Load a snapshot from SNAPSHOT_DIRECTORY into the active collection through the running service"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('name'):
+            return jsonify({'error': 'Snapshot name required'}), 400
+        
+        directory = _snapshot_directory(data['name'])
+        if not os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+            return jsonify({'error': 'Snapshot not found'}), 404
+        
+        result = import_snapshot(get_chromadb_service(), directory, verify=data.get('verify', True))
+        return jsonify(dict(result, success=True))
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error importing collection snapshot: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/documents/add', methods=['POST'])
 def api_add_document():
     """Add a document to the vector database"""
@@ -548,12 +744,28 @@ def api_search_documents():
         query = data['query']
         n_results = data.get('n_results', 5)
         filter_metadata = data.get('filter', None)
+        mode = data.get('mode', None)
         
-        results = chromadb_service.search_documents(query, n_results, filter_metadata)
+        # Shorthand filters for config stanzas, e.g. the bgp sections of R15
+        clauses = [{key: data[key]} for key in ('device', 'stanza_type', 'interface') if data.get(key)]
+        if clauses:
+            if filter_metadata:
+                clauses.append(filter_metadata)
+            filter_metadata = clauses[0] if len(clauses) == 1 else {'$and': clauses}
+        
+        if data.get('rerank', config.rag['RERANK_ENABLED']):
+            # Over-fetch candidates and keep the best n_results by cross-encoder score
+            candidates = chromadb_service.search_documents(
+                query, max(n_results, config.rag['RERANK_CANDIDATES']), filter_metadata, mode=mode
+            )
+            results = reranker.rerank(query, candidates, n_results)
+        else:
+            results = chromadb_service.search_documents(query, n_results, filter_metadata, mode=mode)
         
         return jsonify({
             'success': True,
             'query': query,
+            'mode': mode or config.rag['SEARCH_MODE'],
             'results': results,
             'count': len(results)
         })
@@ -563,6 +775,74 @@ def api_search_documents():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/documents/search/batch', methods=['POST'])
+def api_search_documents_batch():
+    """Search for several queries in one request"""
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('queries'), list) or not data['queries']:
+            return jsonify({'error': 'List of search queries required'}), 400
+        
+        queries = data['queries']
+        n_results = data.get('n_results', 5)
+        filters = data.get('filters', data.get('filter', None))
+        
+        if isinstance(filters, list) and len(filters) != len(queries):
+            return jsonify({'error': 'filters must contain one filter per query'}), 400
+        
+        results = chromadb_service.search_documents_batch(queries, n_results, filters)
+        
+        return jsonify({
+            'success': True,
+            'results': [
+                {'query': query, 'results': query_results, 'count': len(query_results)}
+                for query, query_results in zip(queries, results)
+            ],
+            'count': len(queries)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error batch searching documents: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _rag_messages(data):
+    """Retrieve context for a RAG request and build the model messages
+    
+    Returns (messages, search_results, context_tokens).
+    """
+    query = data['query']
+    n_results = data.get('n_results', 3)
+    mode = data.get('mode', None)
+    
+    # Search for relevant documents
+    if data.get('rerank', config.rag['RERANK_ENABLED']):
+        candidates = chromadb_service.search_documents(
+            query, max(n_results, config.rag['RERANK_CANDIDATES']), mode=mode
+        )
+        search_results = reranker.rerank(query, candidates, n_results)
+    else:
+        search_results = chromadb_service.search_documents(query, n_results, mode=mode)
+    
+    if not search_results:
+        # No relevant documents found, use basic AI response
+        messages = [
+            {"role": "system", "content": "You are a helpful network automation AI assistant."},
+            {"role": "user", "content": query}
+        ]
+        return messages, [], 0
+    
+    # Pack the most relevant lines of the results into the model's context budget
+    system_prompt = "You are a helpful network automation AI assistant. Use the following context to answer questions:\n\nContext:\n"
+    packed = context_builder.build(query, search_results, prompt_overhead=system_prompt)
+    
+    messages = [
+        {"role": "system", "content": f"{system_prompt}{packed['context']}"},
+        {"role": "user", "content": query}
+    ]
+    return messages, search_results, packed['tokens']
+
+
 @app.route('/api/rag/query', methods=['POST'])
 def api_rag_query():
     """Query using RAG (Retrieval-Augmented Generation)"""
@@ -572,25 +852,7 @@ def api_rag_query():
             return jsonify({'error': 'Query required'}), 400
         
         query = data['query']
-        n_results = data.get('n_results', 3)
-        
-        # Search for relevant documents
-        search_results = chromadb_service.search_documents(query, n_results)
-        
-        if not search_results:
-            # No relevant documents found, use basic AI response
-            messages = [
-                {"role": "system", "content": "You are a helpful network automation AI assistant."},
-                {"role": "user", "content": query}
-            ]
-        else:
-            # Build context from search results
-            context = "\n\n".join([f"Document: {result['content'][:500]}..." for result in search_results])
-            
-            messages = [
-                {"role": "system", "content": f"You are a helpful network automation AI assistant. Use the following context to answer questions:\n\nContext:\n{context}"},
-                {"role": "user", "content": query}
-            ]
+        messages, search_results, context_tokens = _rag_messages(data)
         
         # Get AI response with context
         ai_result = ollama_service.chat_completion(messages, temperature=0.7, max_tokens=500)
@@ -601,7 +863,8 @@ def api_rag_query():
                 'query': query,
                 'response': ai_result['response'],
                 'context_documents': len(search_results),
-                'context_used': search_results[:3] if search_results else [],
+                'context_tokens': context_tokens,
+                'context_used': search_results[:3],
                 'model': ai_result['model']
             })
         else:
@@ -615,9 +878,49 @@ def api_rag_query():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/rag/stream', methods=['POST'])
+def api_rag_stream():
+    """Query using RAG and stream the answer as Server-Sent Events
+    
+    With a session_id the query and the answer are saved to that chat history.
+    """
+    try:
+        data = request.get_json()
+        if not data or 'query' not in data:
+            return jsonify({'error': 'Query required'}), 400
+        
+        query = data['query']
+        session_id = data.get('session_id')
+        messages, search_results, context_tokens = _rag_messages(data)
+        
+        if session_id:
+            db_manager.create_chat_message({
+                'session_id': session_id,
+                'message_type': 'user',
+                'content': query
+            })
+        
+        stream = ollama_service.stream_chat_completion(messages, temperature=0.7, max_tokens=500)
+        
+        def events():
+            yield _sse('context', {
+                'query': query,
+                'context_documents': len(search_results),
+                'context_tokens': context_tokens,
+                'context_used': search_results[:3]
+            })
+            yield from _relay_stream(stream, session_id)
+        
+        return _sse_response(events())
+        
+    except Exception as e:
+        logger.error(f"Error in RAG stream: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/documents/upload', methods=['POST'])
 def api_upload_document():
-    """Upload and process document"""
+    """Upload a document and queue it for processing"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -626,27 +929,45 @@ def api_upload_document():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Save file temporarily
         filename = file.filename
+        if not document_processor.supports(filename):
+            return jsonify({'error': f'Unsupported file type: {os.path.splitext(filename)[1]}'}), 400
+        
+        # Save file and process it in the background
         temp_path = os.path.join('data', 'documents', filename)
         file.save(temp_path)
         
-        # Process the document
-        success = document_processor.process_file(temp_path)
+        job = ingest_jobs.submit(temp_path, filename)
         
-        if success:
-            return jsonify({
-                'message': 'Document processed successfully',
-                'filename': filename
-            })
-        else:
-            return jsonify({'error': 'Failed to process document'}), 500
+        return jsonify({
+            'message': 'Document queued for processing',
+            'filename': filename,
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_url': f"/api/documents/jobs/{job['job_id']}"
+        }), 202
             
     except Exception as e:
         logger.error(f"Document upload error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/documents/jobs/<job_id>')
+def api_document_job(job_id):
+    """Get the status and progress of a document processing job"""
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    job.pop('file_path', None)
+    return jsonify(job)
+
+
+@app.route('/api/documents/watcher')
+def api_document_watcher():
+    """Get the status of the documents folder watcher"""
+    return jsonify(folder_watcher.status())
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -702,6 +1023,13 @@ def initialize_default_devices():
 if __name__ == '__main__':
     logger.info("Starting Network Automation AI Agent...")
     
+    # Build services in the background so Flask can bind immediately.
+    # With the debug reloader only the child process serves requests.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        registry.warmup()
+        if config.upload['WATCH_ENABLED']:
+            folder_watcher.start()
+    
     # Initialize default devices if needed
     initialize_default_devices()
     
@@ -0,0 +1,35 @@
+"""
+CLI startup tests
+The command line tools must start when run from src/ as their docstrings say
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+# core imports the database layer and its models, so the tools cannot start without them
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('pydantic')
+
+
+def run_module(module: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-m', module, *args],
+        cwd=SRC_DIR, capture_output=True, text=True, timeout=120
+    )
+
+
+def test_ingest_help():
+    result = run_module('rag.ingest', '--help')
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'usage:' in result.stdout
+
+
+def test_folder_watcher_help():
+    result = run_module('rag.folder_watcher', '--help')
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'usage:' in result.stdout